@@ -0,0 +1,152 @@
+// 数据层 Web Worker：取数、JSON 解码、建索引都在后台线程完成，页面只通过消息查询
+// 协议（客户端见 deps.js 的 createDataClient）：
+//   页面 -> Worker：{type:'init', base} 指定当前代数据目录；{id, type, params} 发起查询
+//   Worker -> 页面：{id, type:'page', data} 流式返回一页结果；{id, type:'done', data} 结束；{id, type:'error', data}
+// 同一 params.channel 上的新查询会让旧查询停止推送（输入框连续输入时只算最后一次）
+
+const PAGE_SIZE = 100
+
+let base = 'data/'
+const files = {}
+const latest = {}
+
+function load(name){
+  return files[name] || (files[name] = fetch(`${base}${name}.json`).then(r=>{if(!r.ok) throw new Error(`加载失败: ${name}`); return r.json()}))
+}
+
+// 规范化查询串，支持全角空格与多种连字符（与 summary.normalize_text 一致）
+function normalizeText(s){ return (s||'').replace(/[\s\u3000\\\-–—－_]/g,'') }
+function extractId(s){ return (s||'').match(/\d{5}/)?.[0] || '' }
+
+// ---------------- 索引（各建一次） ----------------
+
+// 摘要行由构建时的 summary.build_summary_row 预计算（消耗/造成区间、搜索键），
+// 描述与特殊效果只存 texts.json 字典中的下标，这里还原成文本并补上展示用的区间字符串
+let summaryIndex = null
+function getSummaryIndex(){
+  return summaryIndex || (summaryIndex = Promise.all([load('summary'), load('texts')]).then(([summary, texts]) => summary.map(r => {
+    const effects = r.effect_ids.map(i => texts[i]).join('；')
+    return {
+      ...r,
+      description: r.description_ids.map(i => texts[i]).join('\n'),
+      effects_text: effects,
+      consume: (r.consume_min!=null && r.consume_max!=null) ? `${r.consume_min} - ${r.consume_max}` : '-',
+      deal: (r.deal_min!=null && r.deal_max!=null) ? `${r.deal_min} - ${r.deal_max}` : '-',
+      effects,
+    }
+  })))
+}
+
+// 技能编号 -> 明细（从 groups.consume/deal/recover 映射到 values）
+let detailIndex = null
+function getDetailIndex(){
+  return detailIndex || (detailIndex = Promise.all([load('skills'), load('values')]).then(([skills, values]) => {
+    const res = {}
+    for(const s of skills){
+      const sid = s.skill_id
+      const groups = s.groups||{}
+      const pack = {consume:[], deal:[], other:[]}
+      const attach = (bucket, toKey) => {
+        for(const k of Object.keys(bucket||{})){
+          for(const obj of bucket[k]||[]){
+            pack[toKey].push({label: obj.label, rows: values[`${sid}:${obj.label}`]||[]})
+          }
+        }
+      }
+      attach(groups.consume, 'consume')
+      attach(groups.deal, 'deal')
+      attach(groups.recover, 'other')
+      res[sid] = pack
+    }
+    return res
+  }))
+}
+
+// 序列列表附带所属技能名，图表页按序列标识或技能名查询
+let seriesIndex = null
+function getSeriesIndex(){
+  return seriesIndex || (seriesIndex = Promise.all([load('series'), load('summary')]).then(([series, summary]) => {
+    const names = Object.fromEntries(summary.map(s=>[s.sid, s.name]))
+    return series.map(s => ({series_id: s.series_id, skill_id: s.skill_id, label: s.label, name: names[s.skill_id]||''}))
+  }))
+}
+
+// ---------------- 查询 ----------------
+
+// 信息页表格：过滤预计算好的行，按页流式返回；查询串兼容 名称/ID/混合
+async function filterSummary(params, send, stale){
+  const rows = await getSummaryIndex()
+  if(stale()) return {total:0, cancelled:true}
+  const q = (params.q||'').trim()
+  const qId = extractId(q)
+  const qNorm = normalizeText(q)
+  const match = r => !q || r.sid.includes(q) || (qId && r.sid.includes(qId)) || r.name.includes(q) || (qNorm && r.search_key.includes(qNorm))
+  const pageSize = params.pageSize || PAGE_SIZE
+  let page = []
+  let total = 0
+  for(const r of rows){
+    if(!match(r)) continue
+    page.push(r)
+    total++
+    if(page.length >= pageSize){
+      send(page)
+      page = []
+      // 让出线程，接收新的查询；已被取代就不再推送
+      await new Promise(res => setTimeout(res))
+      if(stale()) return {total, cancelled:true}
+    }
+  }
+  if(page.length) send(page)
+  return {total}
+}
+
+async function skillDetail(params){
+  const details = await getDetailIndex()
+  return details[params.sid] || {consume:[], deal:[], other:[]}
+}
+
+// 图表页：匹配的序列按 offset/limit 分页，只把这一页的数值和分析结果发回页面
+async function querySeries(params){
+  const q = (params.q||'').trim()
+  const all = await getSeriesIndex()
+  const selected = all.filter(s => s.series_id.includes(q) || s.name.includes(q))
+  const offset = params.offset || 0
+  const shown = selected.slice(offset, offset + (params.limit || PAGE_SIZE))
+  const [values, analysis] = await Promise.all([load('values'), load('analysis')])
+  const items = shown.map(s => {
+    const vals = values[s.series_id]||[]
+    const a = analysis[s.series_id]||{}
+    return {
+      ...s,
+      values: vals.map(v=>v.value),
+      diffs: vals.slice(1).map(v=>v.diff_to_prev||0),
+      is_linear: !!a.is_linear,
+      jump_points: a.jump_points||[],
+    }
+  })
+  return {matched: selected.length, items}
+}
+
+const handlers = {
+  summary: filterSummary,
+  detail: skillDetail,
+  series: querySeries,
+  charts: () => load('charts'),
+}
+
+self.onmessage = async (e) => {
+  const {id, type, params = {}} = e.data
+  if(type === 'init'){
+    base = e.data.base
+    return
+  }
+  const channel = params.channel
+  if(channel) latest[channel] = id
+  const stale = () => !!channel && latest[channel] !== id
+  try{
+    const data = await handlers[type](params, page => self.postMessage({id, type:'page', data:page}), stale)
+    self.postMessage({id, type:'done', data})
+  }catch(err){
+    self.postMessage({id, type:'error', data:String(err && err.message || err)})
+  }
+}
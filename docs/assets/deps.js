@@ -1,2 +1,45 @@
 window.RESOURCES = ['精神','耐力','气血','内力'];
 window.ACTIONS = ['消耗','造成','回复'];
+
+// 站点数据按代发布：data/current.json 指向当前代目录（见 generations.GenerationStore）。
+// 每个页面只读一次指针，之后的文件都取自同一代，构建中途切换指针也不会读到新旧混杂的数据；
+// 没有指针时（旧的平铺布局）直接读 data/ 下的文件
+let dataBasePromise = null
+window.dataUrl = function(file){
+  if(!dataBasePromise){
+    dataBasePromise = fetch('data/current.json', {cache:'no-store'})
+      .then(r => r.ok ? r.json() : null)
+      .then(m => m && m.path ? `data/${m.path}` : 'data/')
+      .catch(() => 'data/')
+  }
+  return dataBasePromise.then(base => base + file)
+}
+
+// 数据层 Worker（assets/data-worker.js）的客户端：
+//   const data = createDataClient()
+//   await data.request('summary', {q, channel:'rows'}, page => ...)   // page 为流式返回的每一页
+// 返回的 Promise 在查询结束时兑现 done 消息的数据
+window.createDataClient = function(){
+  const worker = new Worker('assets/data-worker.js')
+  const pending = new Map()
+  let seq = 0
+  worker.onmessage = (e)=>{
+    const {id, type, data} = e.data
+    const p = pending.get(id)
+    if(!p) return
+    if(type === 'page'){ if(p.onPage) p.onPage(data); return }
+    pending.delete(id)
+    if(type === 'error') p.reject(new Error(data))
+    else p.resolve(data)
+  }
+  const ready = dataUrl('').then(b => worker.postMessage({type:'init', base:new URL(b, location.href).href}))
+  return {
+    request(type, params = {}, onPage = null){
+      return ready.then(() => new Promise((resolve, reject)=>{
+        const id = ++seq
+        pending.set(id, {resolve, reject, onPage})
+        worker.postMessage({id, type, params})
+      }))
+    },
+  }
+}
@@ -1,55 +1,114 @@
-const { createApp, reactive, onMounted, ref, nextTick } = Vue;
+const { createApp, reactive, onMounted, ref, nextTick, markRaw } = Vue;
 
-function loadJson(name){
-  return fetch(`data/${name}.json`).then(r=>{if(!r.ok) throw new Error('加载失败'); return r.json()})
+// 查询模式下每页绘制的序列条数，“显示更多”每次再向 Worker 取一页
+const SERIES_PAGE = 30
+
+// 聚合视图：分位带（p10-p90、p25-p75）+ 中位数曲线 + 少量离群序列，数据来自构建时生成的 charts.json
+function familyOption(family, showDiff){
+  const pack = family[showDiff ? 'diff' : 'value']
+  const b = pack.bands
+  const levels = b.p50.map((_,i)=> showDiff ? i+2 : i+1)
+  // 带宽 = 上界 - 下界，叠在下界上；ECharts 5.5 默认 stackStrategy 'samesign' 只叠同号值，
+  // 下界为负时带会画错，两条都显式设为 'all'
+  const band = (lo, hi, name, opacity) => ([
+    {name, type:'line', data:b[lo], stack:name, stackStrategy:'all', symbol:'none', lineStyle:{opacity:0}, tooltip:{show:false}},
+    {name, type:'line', data:b[hi].map((v,i)=> v==null || b[lo][i]==null ? null : v - b[lo][i]), stack:name, stackStrategy:'all', symbol:'none', lineStyle:{opacity:0}, areaStyle:{color:'#1677ff', opacity}, tooltip:{show:false}},
+  ])
+  const series = [
+    ...band('p10', 'p90', 'P10-P90', 0.12),
+    ...band('p25', 'p75', 'P25-P75', 0.25),
+    {name:'中位数', type:'line', data:b.p50, lineStyle:{width:3, color:'#1677ff'}, itemStyle:{color:'#1677ff'}},
+  ]
+  for(const o of pack.outliers){
+    series.push({name:o.name, type:'line', data:o.data, lineStyle:{type:'dashed'}})
+  }
+  return {
+    title:{text:`${family.family}（${family.series_count} 条序列）`},
+    tooltip:{trigger:'axis'}, legend:{type:'scroll', top:30},
+    grid:{left:60,right:20,top:70,bottom:40},
+    xAxis:{type:'category', data:levels}, yAxis:{type:'value'}, series,
+  }
+}
+
+// 查询视图：items 为 Worker 返回的已分页序列（数值、差值、线性与跃迁点）
+function seriesOption(items, showDiff){
+  const maxLen = Math.max(0,...items.map(s=>s.values.length))
+  const opt = {title:{text:'序列折线图'},tooltip:{trigger:'axis'},legend:{type:'scroll'},grid:{left:50,right:20,top:40,bottom:40},xAxis:{type:'category'},yAxis:{type:'value'},series:[]}
+  opt.xAxis.data = Array.from({length:maxLen}).map((_,i)=>i+1)
+  for(const s of items){
+    const data = showDiff ? s.diffs : s.values
+    const line = {name:`${s.name} ${s.label}`,type:'line',data}
+    if(s.is_linear){
+      line.lineStyle = {color:'#2e7d32'}
+    }
+    if(s.jump_points.length){
+      // jump_points 是级次（从 1 开始），差值曲线比数值曲线少第 1 级
+      const idx = jp => showDiff ? jp-2 : jp-1
+      line.markPoint = {data: s.jump_points.filter(jp=>idx(jp)>=0).map(jp=>({coord:[idx(jp), data[idx(jp)]], value:'跳'}))}
+    }
+    opt.series.push(line)
+  }
+  return opt
 }
 
 createApp({
   setup(){
-    const state = reactive({ 
-      skills:[], series:[], values:{}, analysis:{}, 
-      q:'', 
-      showDiff: false 
+    const state = reactive({
+      charts:{families:[]},
+      family:'',
+      q:'',
+      showDiff: false,
+      matched: 0,
+      shown: 0,
     })
     const selectedKeys = ref(['charts'])
     const chartEl = ref(null)
+    const data = createDataClient()
     let chartInstance = null
+    // 已取回的序列页（只读，不做响应式代理）；query 变化时清空
+    let items = []
+    let itemsQuery = null
 
-    const apply = () => {
+    const render = async () => {
       if(!chartInstance) return
       const query = (state.q||'').trim()
-      const skillMap = Object.fromEntries(state.skills.map(s=>[s.skill_id,s.name]))
-      const selected = state.series.filter(s=>!query || s.series_id.includes(query) || (skillMap[s.skill_id]||'').includes(query))
-      const grid = {left:50,right:20,top:40,bottom:40}
-      const opt = {title:{text:'序列折线图'},tooltip:{trigger:'axis'},legend:{},grid,xAxis:{type:'category'},yAxis:{type:'value'},series:[]}
-      const maxLen = Math.max(0,...selected.map(s=>state.values[s.series_id]?.length||0))
-      opt.xAxis.data = Array.from({length:maxLen}).map((_,i)=>i+1)
-      for(const s of selected){
-        const vals = state.values[s.series_id]||[]
-        const name = `${skillMap[s.skill_id]||''} ${s.label}`
-        const data = state.showDiff? vals.slice(1).map(v=>v.diff_to_prev||0) : vals.map(v=>v.value)
-        opt.series.push({name,type:'line',data})
-        const a = state.analysis[s.series_id]||{}
-        if(a.is_linear){
-          opt.series[opt.series.length-1].lineStyle = {color:'#2e7d32'}
-        }
-        const jumps = (a.jump_points||[])
-        for(const jp of jumps){
-          opt.series[opt.series.length-1].markPoint = {data:[{coord:[jp, data[jp-1]], value:'跳'}]}
-        }
+      if(!query){
+        const family = state.charts.families.find(f=>f.family===state.family) || state.charts.families[0]
+        state.matched = 0
+        state.shown = 0
+        if(family) chartInstance.setOption(familyOption(family, state.showDiff), true)
+        return
+      }
+      if(itemsQuery !== query){
+        // 序列明细（values/analysis）在 Worker 中第一次查询时加载
+        const res = await data.request('series', {q:query, offset:0, limit:SERIES_PAGE})
+        if((state.q||'').trim() !== query) return
+        items = markRaw(res.items)
+        itemsQuery = query
+        state.matched = res.matched
       }
-      chartInstance.setOption(opt, true)
+      state.shown = items.length
+      chartInstance.setOption(seriesOption(items, state.showDiff), true)
+    }
+
+    const apply = () => {
+      itemsQuery = null
+      render()
+    }
+
+    const showMore = async () => {
+      const query = itemsQuery
+      const res = await data.request('series', {q:query, offset:items.length, limit:SERIES_PAGE})
+      if(itemsQuery !== query) return
+      items = markRaw(items.concat(res.items))
+      render()
     }
 
     onMounted(async ()=>{
-      // Load Data
-      const [skills, series, values, analysis] = await Promise.all([
-        loadJson('skills'), loadJson('series'), loadJson('values'), loadJson('analysis')
-      ])
-      state.skills = skills
-      state.series = series
-      state.values = values
-      state.analysis = analysis
+      // 图表聚合数据也由 Worker 取回解码
+      const charts = await data.request('charts')
+      state.charts = markRaw(charts)
+      state.family = charts.families[0]?.family || ''
 
       // Init Chart
       await nextTick()
@@ -60,11 +119,13 @@ createApp({
       }
     })
 
-    return { 
-      state, 
+    return {
+      state,
       selectedKeys,
       chartEl,
-      apply
+      apply,
+      render,
+      showMore
     }
   }
 })
@@ -0,0 +1,42 @@
+const { createApp, reactive, ref } = Vue
+
+// 常用查询：都能命中 report.sqlite3 上的索引，只需读取少量页
+const PRESETS = [
+  { key:'skill', label:'按技能编号', sql:"SELECT s.skill_id, s.name, r.series_id, r.label FROM skills s JOIN series r ON r.skill_id = s.skill_id WHERE s.skill_id = ?", hint:'如 30535' },
+  { key:'name', label:'按技能名称', sql:"SELECT skill_id, name FROM skills WHERE name = ?", hint:'如 空穴来风' },
+  { key:'label', label:'按序列标签', sql:"SELECT r.series_id, r.label, a.trend, a.is_linear, a.min, a.max FROM series r JOIN analysis a ON a.series_id = r.series_id WHERE r.label = ?", hint:'如 外功伤害' },
+  { key:'values', label:'序列数值', sql:"SELECT level_index, value, diff_to_prev, is_jump FROM values_tbl WHERE series_id = ? ORDER BY level_index", hint:'如 30535:精神' },
+  { key:'family', label:'序列族统计', sql:"SELECT f.series_count, f.linear_count, f.increasing, f.decreasing, f.mixed, f.with_jumps, l.level_index, l.count, l.mean, l.p50, l.p90, l.jump_count FROM agg_families f JOIN agg_levels l ON l.family = f.family WHERE f.family = ? ORDER BY l.level_index", hint:'如 消耗精神' },
+  { key:'sql', label:'自定义 SQL', sql:'', hint:'任意只读 SQL' },
+]
+
+createApp({
+  setup(){
+    const selectedKeys = ref(['query'])
+    const state = reactive({ preset:'skill', param:'', sql:'', rows:[], columns:[], loading:false, error:'', bytes:0, elapsed:0 })
+    const current = () => PRESETS.find(p=>p.key===state.preset)
+
+    const run = async () => {
+      state.loading = true
+      state.error = ''
+      try{
+        const db = await openReportDb()
+        const p = current()
+        const t0 = performance.now()
+        const rows = p.key === 'sql' ? await db.query(state.sql) : await db.query(p.sql, [state.param.trim()])
+        state.elapsed = Math.round(performance.now() - t0)
+        state.bytes = await db.bytesRead()
+        state.columns = Object.keys(rows[0]||{}).map(k=>({ title:k, dataIndex:k, key:k }))
+        state.rows = rows.map((r,i)=>({ __key:i, ...r }))
+      }catch(e){
+        state.error = String(e?.message || e)
+      }finally{
+        state.loading = false
+      }
+    }
+
+    return { state, selectedKeys, presets: PRESETS, current, run }
+  }
+})
+.use(antd)
+.mount('#app')
@@ -0,0 +1,36 @@
+// 静态 SQLite 加载器：当前代数据目录下的 report.sqlite3 由构建时的 static_db.publish_static_db 生成
+// 基于 sql.js-httpvfs，数据库文件不整体下载，查询时通过 HTTP Range 请求只拉取用到的页
+// 本地测试需要支持 Range 的静态服务：python -m skill_growth_report.serve --site-dir docs
+
+const SQLITE_HTTPVFS_CDN = 'https://cdn.jsdelivr.net/npm/sql.js-httpvfs@0.8.12'
+// 与 static_db.STATIC_PAGE_SIZE 一致：一次 Range 请求正好取一页
+const REPORT_DB_PAGE_SIZE = 1024
+
+let reportDbPromise = null
+
+function openReportDb(){
+  if(!reportDbPromise){
+    reportDbPromise = (async ()=>{
+      const { createDbWorker } = await import(`${SQLITE_HTTPVFS_CDN}/+esm`)
+      const dbUrl = new URL(await dataUrl('report.sqlite3'), location.href).href
+      // Worker 不能跨域直接加载，用同源 blob 包一层 importScripts
+      const workerUrl = URL.createObjectURL(new Blob(
+        [`importScripts('${SQLITE_HTTPVFS_CDN}/dist/sqlite.worker.js')`],
+        {type:'application/javascript'}
+      ))
+      const worker = await createDbWorker(
+        [{from:'inline', config:{serverMode:'full', url:dbUrl, requestChunkSize:REPORT_DB_PAGE_SIZE}}],
+        workerUrl,
+        `${SQLITE_HTTPVFS_CDN}/dist/sql-wasm.wasm`
+      )
+      return {
+        query: (sql, params=[]) => worker.db.query(sql, params),
+        // 累计通过 Range 请求读取的字节数，用来确认没有整库下载
+        bytesRead: () => worker.worker.bytesRead,
+      }
+    })()
+  }
+  return reportDbPromise
+}
+
+window.openReportDb = openReportDb
@@ -1,5 +1,4 @@
 import fitz  # PyMuPDF
-from deep_translator import GoogleTranslator
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
@@ -7,7 +6,12 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.colors import black
 import time
-import os
+import io
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from translation_kit import CachedTranslator, GoogleBackend, ImageStore, LayoutCache, PageCheckpointStore, StreamingStory, TranslationMemory
 
 # 注册中文字体
 try:
@@ -15,33 +19,17 @@ try:
 except:
     print("SimSun font not found. Please check font path.")
 
-def translate_text(text):
-    if not text.strip():
-        return ""
-    
-    # 移除多余换行，保留段落完整性
-    text = text.replace('\n', ' ')
-    
-    translator = GoogleTranslator(source='auto', target='zh-CN')
-    chunk_size = 4500
-    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-    
-    translated_chunks = []
-    for chunk in chunks:
-        try:
-            res = translator.translate(chunk)
-            if res:
-                translated_chunks.append(res)
-            else:
-                translated_chunks.append(chunk) # 翻译返回None时保留原文
-            time.sleep(0.5) 
-        except Exception as e:
-            print(f"Translation error: {e}")
-            translated_chunks.append(chunk)
-    
-    return "".join(translated_chunks)
+# 图片截图参数：默认 150 dpi，渲染后长边不超过 IMAGE_MAX_SIDE 像素（大图自动降 dpi）
+IMAGE_DPI = 150
+IMAGE_MAX_SIDE = 2000
+# get_text("blocks") 默认不返回图片 block，需要显式带上 TEXT_PRESERVE_IMAGES
+BLOCK_FLAGS = fitz.TEXTFLAGS_BLOCKS | fitz.TEXT_PRESERVE_IMAGES
 
-def generate_pdf(output_filename, content_list):
+def generate_pdf(output_filename, content_list, images=None):
+    """
+    images 为 ImageStore 时，image 条目的 content 是图片指纹，直接从内存/检查点读取字节。
+    返回是否成功写出 PDF。
+    """
     doc = SimpleDocTemplate(output_filename, pagesize=A4)
     styles = getSampleStyleSheet()
     
@@ -58,25 +46,21 @@ def generate_pdf(output_filename, content_list):
     # ReportLab Image flowable is centered by default in SimpleDocTemplate if not specified otherwise? 
     # Actually need to wrap in flowable or just append.
     
-    story = []
-    
-    for item in content_list:
+    def to_flowables(item):
         if item['type'] == 'text':
             text = item['content'].replace('<', '&lt;').replace('>', '&gt;')
-            p = Paragraph(text, normal_style)
-            story.append(p)
+            return [Paragraph(text, normal_style)]
         elif item['type'] == 'page_break':
-            story.append(PageBreak())
+            return [PageBreak()]
         elif item['type'] == 'header':
              text = item['content'].replace('<', '&lt;').replace('>', '&gt;')
-             p = Paragraph(f"<b>{text}</b>", normal_style)
-             story.append(p)
-             story.append(Spacer(1, 10))
+             return [Paragraph(f"<b>{text}</b>", normal_style), Spacer(1, 10)]
         elif item['type'] == 'image':
             img_path = item['content']
             try:
                 # 限制图片宽度，保持比例
-                img = ReportLabImage(img_path)
+                src = io.BytesIO(images.get(img_path)) if images is not None else img_path
+                img = ReportLabImage(src)
                 # A4 width is approx 595 points. Margins are usually 72. So usable is ~450.
                 max_width = 450
                 img_width = img.drawWidth
@@ -87,82 +71,265 @@ def generate_pdf(output_filename, content_list):
                     img.drawWidth = max_width
                     img.drawHeight = img_height * ratio
                 
-                story.append(Spacer(1, 10))
-                story.append(img)
-                story.append(Spacer(1, 10))
+                return [Spacer(1, 10), img, Spacer(1, 10)]
             except Exception as e:
                 print(f"Error adding image {img_path}: {e}")
+        return []
+
+    # content_list 可以是列表，也可以是从检查点逐页读取的生成器
+    story = StreamingStory(to_flowables(item) for item in content_list)
 
     try:
         doc.build(story)
         print(f"PDF generated: {output_filename}")
+        return True
     except Exception as e:
         print(f"PDF generation failed: {e}")
+        return False
 
-def process_pdf(input_pdf, output_pdf, start_page=0, end_page=None):
+def extract_image_block(page, block, images, dpi=IMAGE_DPI, max_side=IMAGE_MAX_SIDE):
+    # PyMuPDF block 图片只是占位符，我们需要提取实际图片
+    # 或者我们可以直接截图 bbox 区域 (clip)
+    # 使用 page.get_pixmap(clip=bbox) 可以获取该区域的截图，这样即使是表格或复杂矢量图也能保留
+    # 这比提取 raw image 更稳健（raw image 可能是 mask 或 fragmented）
+    try:
+        rect = fitz.Rect(block[:4])
+        longest = max(rect.width, rect.height)
+        if longest <= 0:
+            return None
+        # 截图该区域，长边超过上限时降低 dpi
+        pix = page.get_pixmap(clip=rect, dpi=max(1, int(min(dpi, max_side * 72 / longest))))
+        # 以像素内容做指纹：每页重复的 logo、重复出现的图只做一次 PNG 编码和存储
+        fingerprint = b"%d:%d:%d:" % (pix.width, pix.height, pix.n) + pix.samples
+        digest = images.add(fingerprint, lambda: pix.tobytes("png"))
+        return {'type': 'image', 'content': digest}
+    except Exception as e:
+        print(f"Error extracting image block: {e}")
+        return None
+
+def page_blocks(page, layout):
+    """按阅读顺序返回页面的文本/图片 block，栏模板由 layout 在同一文档内复用。"""
+    blocks = page.get_text("blocks", flags=BLOCK_FLAGS)
+    return layout.order(blocks, page.rect.width, page.rect.height)
+
+def benchmark_layout(input_pdf, start_page=0, end_page=None):
+    """
+    本地测速（不联网）：只做 block 提取 + 版式分析，返回 pages/sec。
+    分别统计启用版式缓存和每页重新聚类两种情况。
+    """
+    doc = fitz.open(input_pdf)
+    if end_page is None or end_page > len(doc):
+        end_page = len(doc)
+    pages = [doc[i] for i in range(start_page, end_page)]
+    raw = [(page.get_text("blocks", flags=BLOCK_FLAGS), page.rect.width, page.rect.height) for page in pages]
+    result = {}
+    for name, cached in (("cached", True), ("uncached", False)):
+        layout = LayoutCache()
+        t0 = time.perf_counter()
+        for page in pages:
+            if not cached:
+                layout = LayoutCache()
+            page_blocks(page, layout)
+        elapsed = time.perf_counter() - t0
+        result[name] = len(pages) / elapsed if elapsed else float("inf")
+    # 单独统计版式分析本身（不含 PyMuPDF 提取）
+    layout = LayoutCache()
+    t0 = time.perf_counter()
+    for blocks, width, height in raw:
+        layout.order(blocks, width, height)
+    elapsed = time.perf_counter() - t0
+    result["layout_only"] = len(raw) / elapsed if elapsed else float("inf")
+    result["layout_stats"] = layout.stats
+    print(f"Layout benchmark ({len(pages)} pages): {result}")
+    return result
+
+def finish_job(store, output_pdf, content_list, images, page_indexes):
+    """生成最终 PDF；全部页都已完整翻译且 PDF 写出成功后，删除检查点里的图片。"""
+    if generate_pdf(output_pdf, content_list, images) and store is not None and store.is_complete(page_indexes):
+        store.remove_images()
+
+def process_pdf(input_pdf, output_pdf, start_page=0, end_page=None, job_dir=None, image_dpi=IMAGE_DPI, image_max_side=IMAGE_MAX_SIDE, backend=None, rate=2.0):
+    """
+    job_dir 不为空时按页写检查点，可断点续跑，见 translation_kit.PageCheckpointStore。
+    整个任务共用一个 backend 实例和一个限速器（CachedTranslator，不带翻译记忆）；
+    backend 默认为 GoogleBackend，测试时可传入 translation_kit.StubBackend()。
+    """
     print(f"Processing {input_pdf}...")
+    translator = CachedTranslator(backend or GoogleBackend(), rate=rate)
     doc = fitz.open(input_pdf)
     
     if end_page is None or end_page > len(doc):
         end_page = len(doc)
     
     content_list = []
-    temp_img_dir = "temp_images"
-    if not os.path.exists(temp_img_dir):
-        os.makedirs(temp_img_dir)
+    store = PageCheckpointStore(job_dir, input_pdf, "optimize_translation", "sequential") if job_dir else None
+    layout = LayoutCache()
+    # 没有检查点时图片只留在内存里，不再产生 temp_images 目录
+    images = ImageStore(store.images_dir if store is not None else None)
         
     for i in range(start_page, end_page):
+        if store is not None and store.has_page(i):
+            print(f"Skipping page {i+1} (checkpointed)")
+            continue
         print(f"Processing page {i+1}...")
         page = doc[i]
         
         # 提取 Block，包含文本和图像
         # blocks: (x0, y0, x1, y1, "lines", block_no, block_type)
         # block_type: 0=text, 1=image
-        blocks = page.get_text("blocks")
-        
-        # 排序：PyMuPDF 默认排序通常是阅读顺序，但对于双栏，有时需要检查
-        # 简单的双栏排序策略：先按 y 排序，再按 x？不对。
-        # 标准双栏：左栏 (x < width/2) 先读完，右栏 (x > width/2) 后读。
-        # 我们可以根据 x0 坐标判断栏目。
-        # 但 PyMuPDF 的 "blocks" 模式通常已经尝试按阅读顺序排序了。
-        # 让我们先信任默认顺序，如果乱了再调整。
+        # PyMuPDF 的默认顺序在双栏论文里经常左右交错，这里按检测到的栏重新排序：
+        # 通栏标题/图片把页面分段，段内先左栏后右栏（见 translation_kit.order_blocks）
+        blocks = page_blocks(page, layout)
         
-        # 实际上，PyMuPDF blocks 默认顺序就是 reading order (text extraction order)
-        
-        content_list.append({'type': 'header', 'content': f"--- 第 {i+1} 页 ---"})
+        page_items = [{'type': 'header', 'content': f"--- 第 {i+1} 页 ---"}]
+        text_items = []
         
         for block in blocks:
-            bbox = block[:4]
             text = block[4]
             block_type = block[6]
             
             if block_type == 0: # 文本
                 if text.strip():
-                    translated = translate_text(text)
-                    content_list.append({'type': 'text', 'content': translated})
+                    item = {'type': 'text', 'content': text}
+                    page_items.append(item)
+                    text_items.append(item)
             elif block_type == 1: # 图像
-                # PyMuPDF block 图片只是占位符，我们需要提取实际图片
-                # 或者我们可以直接截图 bbox 区域 (clip)
-                # 使用 page.get_pixmap(clip=bbox) 可以获取该区域的截图，这样即使是表格或复杂矢量图也能保留
-                # 这比提取 raw image 更稳健（raw image 可能是 mask 或 fragmented）
-                
-                try:
-                    # 截图该区域
-                    pix = page.get_pixmap(clip=bbox, dpi=150) # dpi 提高一点清晰度
-                    img_filename = f"{temp_img_dir}/page_{i+1}_block_{block[5]}.png"
-                    pix.save(img_filename)
-                    content_list.append({'type': 'image', 'content': img_filename})
-                except Exception as e:
-                    print(f"Error extracting image block: {e}")
+                item = extract_image_block(page, block, images, image_dpi, image_max_side)
+                if item:
+                    page_items.append(item)
         
-        content_list.append({'type': 'page_break'})
+        # 整页的文本 block 合批翻译，而不是每个 block 一次请求
+        failed = []
+        translated = translator.translate_many([it['content'] for it in text_items], failed)
+        for item, res in zip(text_items, translated):
+            item['content'] = res
+        page_items.append({'type': 'page_break'})
+        if store is not None:
+            # 有 block 保留了原文的页只记为部分完成，重跑时重新翻译
+            store.save_page(i, page_items, complete=not failed)
+        else:
+            content_list.extend(page_items)
     
-    generate_pdf(output_pdf, content_list)
-    
-    # 清理临时图片
-    # import shutil
-    # shutil.rmtree(temp_img_dir)
+    if store is not None:
+        content_list = store.iter_items(range(start_page, end_page))
+    finish_job(store, output_pdf, content_list, images, range(start_page, end_page))
+    print(f"Translation stats: {translator.stats}")
+    print(f"Image stats: {images.stats}")
+
+def process_pdf_pipelined(input_pdf, output_pdf, start_page=0, end_page=None, backend=None, memory_path="translation_memory.db", workers=4, rate=2.0, job_dir=None, batch_pages=2, image_dpi=IMAGE_DPI, image_max_side=IMAGE_MAX_SIDE):
+    """
+    流水线版本：提取、翻译、按页组装三段并发执行。
+    - 主线程逐页提取 block，每 batch_pages 页的文本块合批后提交给有界线程池翻译
+    - 组装线程按页序等待译文并拼出每页的 content 条目（content_list 或检查点）
+    - 翻译走 CachedTranslator：翻译记忆去重 + 限速 + 退避重试
+    PDF 在全部页组装完成后才生成（reportlab 需要按顺序一次性排版），不与翻译重叠；
+    有检查点时从检查点逐页流式读取，内存里同一时刻只有一页。
+    backend 默认为 GoogleBackend，测试时可传入 translation_kit.StubBackend()。
+    job_dir 不为空时组装线程把每页写入检查点而不是内存，重跑时跳过已完成的页。
+    """
+    print(f"Processing {input_pdf} (pipelined, {workers} workers)...")
+    translator = CachedTranslator(backend or GoogleBackend(), TranslationMemory(memory_path), rate=rate)
+    doc = fitz.open(input_pdf)
+
+    if end_page is None or end_page > len(doc):
+        end_page = len(doc)
+
+    content_list = []
+    store = PageCheckpointStore(job_dir, input_pdf, "optimize_translation", "pipelined") if job_dir else None
+    layout = LayoutCache()
+    # 没有检查点时图片只留在内存里，不再产生 temp_images 目录
+    images = ImageStore(store.images_dir if store is not None else None)
+
+    # 有界队列：提取最多领先组装 2*workers 页，避免把整本书的 future 都堆在内存里
+    pages_q = queue.Queue(maxsize=workers * 2)
+
+    # 组装出错时记录异常并继续取空队列，避免主线程在有界队列的 put 上永久阻塞（同 build._Stage）
+    errors = []
+
+    def assemble_page(page_index, parts):
+        page_items = [{'type': 'header', 'content': f"--- 第 {page_index+1} 页 ---"}]
+        complete = True
+        for part in parts:
+            if isinstance(part, dict):
+                page_items.append(part)
+            else:
+                fut, idx, failed = part
+                page_items.append({'type': 'text', 'content': fut.result()[idx]})
+                complete = complete and idx not in failed
+        page_items.append({'type': 'page_break'})
+        if store is not None:
+            # 有 block 保留了原文的页只记为部分完成，重跑时重新翻译
+            store.save_page(page_index, page_items, complete=complete)
+        else:
+            content_list.extend(page_items)
+        print(f"Page {page_index+1} assembled.")
+
+    def assemble():
+        while True:
+            job = pages_q.get()
+            if job is None:
+                break
+            if errors:
+                continue
+            try:
+                assemble_page(*job)
+            except BaseException as e:
+                errors.append(e)
+
+    assembler = threading.Thread(target=assemble, daemon=True)
+    assembler.start()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            # 攒够 batch_pages 页的文本块，一次 translate_many 合批翻译
+            window = []
+            texts = []
+
+            def flush():
+                # translate_many 完成时 failed 已填好，组装线程在 fut.result() 之后才读它
+                failed = []
+                fut = pool.submit(translator.translate_many, list(texts), failed)
+                for page_index, parts in window:
+                    pages_q.put((page_index, [(fut, p, failed) if isinstance(p, int) else p for p in parts]))
+                window.clear()
+                texts.clear()
+
+            for i in range(start_page, end_page):
+                if errors:
+                    break
+                if store is not None and store.has_page(i):
+                    continue
+                page = doc[i]
+                parts = []
+                for block in page_blocks(page, layout):
+                    text = block[4]
+                    if block[6] == 0:
+                        if text.strip():
+                            parts.append(len(texts))
+                            texts.append(text)
+                    elif block[6] == 1:
+                        item = extract_image_block(page, block, images, image_dpi, image_max_side)
+                        if item:
+                            parts.append(item)
+                window.append((i, parts))
+                if len(window) >= batch_pages:
+                    flush()
+            if window and not errors:
+                flush()
+        finally:
+            pages_q.put(None)
+            assembler.join()
+
+    if errors:
+        translator.close()
+        raise errors[0]
+    if store is not None:
+        content_list = store.iter_items(range(start_page, end_page))
+    finish_job(store, output_pdf, content_list, images, range(start_page, end_page))
+    print(f"Translation stats: {translator.stats}")
+    print(f"Image stats: {images.stats}")
+    translator.close()
 
 if __name__ == "__main__":
-    # 处理全部页面
-    process_pdf("2303.18223v16.pdf", "2303.18223v16_full_translated.pdf", start_page=0, end_page=None)
+    # 处理全部页面（流水线模式，翻译记忆保存在 translation_memory.db，检查点保存在 translate_job/）
+    process_pdf_pipelined("2303.18223v16.pdf", "2303.18223v16_full_translated.pdf", start_page=0, end_page=None, job_dir="translate_job")
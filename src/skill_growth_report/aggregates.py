@@ -0,0 +1,82 @@
+import json
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session
+
+from .charts import percentile, PERCENTILES
+from .dbkit.models import Series, Value, Analysis, LevelAggregate, FamilyAggregate
+from .models import Series as SeriesRecord
+
+
+def families_of(series: Iterable[SeriesRecord]) -> Set[str]:
+    return {x.family for x in series}
+
+
+def _level_rows(family: str, curves: List[List[float]], jumps: List[List[int]]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    max_len = max((len(c) for c in curves), default=0)
+    jump_counts: Dict[int, int] = {}
+    for jp in jumps:
+        for j in set(jp):
+            jump_counts[j] = jump_counts.get(j, 0) + 1
+    for i in range(max_len):
+        col = sorted(c[i] for c in curves if i < len(c))
+        row: Dict[str, Any] = {
+            "family": family,
+            "level_index": i + 1,
+            "count": len(col),
+            "min": col[0],
+            "max": col[-1],
+            "mean": sum(col) / len(col),
+            "jump_count": jump_counts.get(i + 1, 0),
+        }
+        for p in PERCENTILES:
+            row[f"p{p}"] = percentile(col, p)
+        rows.append(row)
+    return rows
+
+
+def refresh_aggregates(session: Session, families: Optional[Set[str]] = None) -> int:
+    """
+    重算指定序列族的物化聚合（agg_levels / agg_families）。
+    分位数无法增量更新，所以按族整体重算，但只重算本次有序列变化的族；
+    families 为 None 时清空并重算全部。返回重算的族数。调用方负责提交事务。
+    """
+    if families is None:
+        session.query(LevelAggregate).delete(synchronize_session=False)
+        session.query(FamilyAggregate).delete(synchronize_session=False)
+        families = set(session.execute(select(Series.family).distinct()).scalars())
+    level_rows: List[Dict[str, Any]] = []
+    family_rows: List[Dict[str, Any]] = []
+    for family in sorted(families):
+        session.query(LevelAggregate).filter(LevelAggregate.family == family).delete(synchronize_session=False)
+        session.query(FamilyAggregate).filter(FamilyAggregate.family == family).delete(synchronize_session=False)
+        ids = select(Series.series_id).where(Series.family == family)
+        curves: Dict[str, List[float]] = {}
+        for series_id, v in session.execute(
+            select(Value.series_id, Value.value).where(Value.series_id.in_(ids)).order_by(Value.series_id, Value.level_index)
+        ):
+            curves.setdefault(series_id, []).append(v)
+        analyses = session.execute(
+            select(Analysis.is_linear, Analysis.trend, Analysis.count, Analysis.jump_points).where(Analysis.series_id.in_(ids))
+        ).all()
+        if not analyses:
+            continue
+        jumps = [json.loads(a.jump_points) for a in analyses]
+        level_rows.extend(_level_rows(family, list(curves.values()), jumps))
+        family_rows.append({
+            "family": family,
+            "series_count": len(analyses),
+            "linear_count": sum(1 for a in analyses if a.is_linear),
+            "increasing": sum(1 for a in analyses if a.trend == "increasing"),
+            "decreasing": sum(1 for a in analyses if a.trend == "decreasing"),
+            "mixed": sum(1 for a in analyses if a.trend == "mixed"),
+            "with_jumps": sum(1 for j in jumps if j),
+            "max_levels": max(a.count for a in analyses),
+        })
+    if level_rows:
+        session.execute(insert(LevelAggregate), level_rows)
+    if family_rows:
+        session.execute(insert(FamilyAggregate), family_rows)
+    return len(families)
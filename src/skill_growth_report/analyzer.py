@@ -1,7 +1,9 @@
-from typing import List, Dict, Any
+from typing import List, Sequence
 
+from .models import Analysis
 
-def diffs(values: List[float]) -> List[float]:
+
+def diffs(values: Sequence[float]) -> List[float]:
     ds: List[float] = []
     for i in range(len(values) - 1):
         ds.append(values[i + 1] - values[i])
@@ -37,15 +39,14 @@ def jumps(diffs_list: List[float], threshold: float) -> List[int]:
     return res
 
 
-def analyze(values: List[float], threshold: float) -> Dict[str, Any]:
+def analyze(values: Sequence[float], threshold: float) -> Analysis:
     ds = diffs(values)
-    return {
-        "count": len(values),
-        "min": min(values) if values else None,
-        "max": max(values) if values else None,
-        "diffs": ds,
-        "is_linear": is_linear(ds),
-        "trend": trend(ds),
-        "jump_points": jumps(ds, threshold),
-    }
+    return Analysis(
+        is_linear=is_linear(ds),
+        trend=trend(ds),
+        min=min(values) if values else None,
+        max=max(values) if values else None,
+        count=len(values),
+        jump_points=jumps(ds, threshold),
+    )
 
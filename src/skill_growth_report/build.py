@@ -1,13 +1,23 @@
-import argparse
 import json
+import queue
+import threading
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
 from .parser import find_skills, extract_sequences, extract_description, extract_special_effects
-from .analyzer import analyze, diffs
+from .analyzer import analyze
+from .charts import sequence_family, sequence_group
+from .aggregates import refresh_aggregates
+from .models import Sequence, Series, Skill
+from .textdict import TextDictionary
 from .dbkit.base import get_session
-from .dbkit.crud import upsert_skill, upsert_series, replace_values, upsert_analysis
-from .export import export_all, ensure_dir
+from .dbkit.crud import upsert_skill, upsert_series, replace_values, upsert_analysis, replace_skills_bulk, load_texts, insert_texts, replace_skill_texts
+from .export import export_all, ensure_dir, ExportCollector
+from .generations import stage_db, publish_db, KEEP_GENERATIONS
+
+# 流水线构建：每批技能数、每个队列最多积压的批数
+BATCH_SIZE = 200
+PIPELINE_DEPTH = 4
 
 def unique_label(existing: Dict[str, Any], label: str) -> str:
     if label not in existing:
@@ -24,23 +34,12 @@ def read_text(fp: Path) -> str:
     return fp.read_text(encoding="utf-8")
 
 
-def build_groups_from_sequences(seqs: List[Dict[str, Any]]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
-    groups: Dict[str, Dict[str, List[Dict[str, Any]]]] = {"consume": {}, "deal": {}, "recover": {}}
-    def push(bucket: Dict[str, List[Dict[str, Any]]], key: str, item: Dict[str, Any]) -> None:
-        bucket.setdefault(key, []).append({"label": item["label"], "values": item["values"]})
+def build_groups_from_sequences(seqs: List[Sequence]) -> Dict[str, Dict[str, List[Sequence]]]:
+    groups: Dict[str, Dict[str, List[Sequence]]] = {"consume": {}, "deal": {}, "recover": {}}
     for it in seqs:
-        act = it.get("action")
-        res_name = it.get("resource") or ""
-        lab = it.get("label")
-        if act == "消耗" and res_name in ("精神", "耐力", "气血", "内力"):
-            push(groups["consume"], res_name, it)
-        elif act in ("回复", "恢复") and res_name in ("精神", "耐力", "气血", "内力"):
-            push(groups["recover"], res_name, it)
-        else:
-            if lab.endswith("伤害"):
-                push(groups["deal"], lab, it)
-            elif act == "造成" and res_name in ("精神", "耐力"):
-                push(groups["deal"], res_name + "打击", it)
+        group = sequence_group(it)
+        if group is not None:
+            groups[group[0]].setdefault(group[1], []).append(it)
     return groups
 
 
@@ -55,60 +54,182 @@ def compute_skill_meta(block: str) -> Dict[str, Any]:
     return meta
 
 
-def build_series_for_skill(session, sid: str, seqs: List[Dict[str, Any]], jump_threshold: float) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
-    series_out: List[Dict[str, Any]] = []
-    values_out: Dict[str, List[Dict[str, Any]]] = {}
-    analyses_out: Dict[str, Dict[str, Any]] = {}
+def build_series_for_skill(sid: str, seqs: List[Sequence], jump_threshold: float) -> List[Series]:
+    series_out: List[Series] = []
     store: Dict[str, Any] = {}
     for item in seqs:
-        label = unique_label(store, item["label"])
-        store[label] = item["values"]
-        series_id = f"{sid}:{label}"
-        upsert_series(session, series_id, sid, label, item["units"], json.dumps({}))
-        ds = diffs(item["values"]) if len(item["values"]) > 1 else []
-        rows: List[Dict[str, Any]] = []
-        for idx, v in enumerate(item["values"], start=1):
-            d = None
-            if idx > 1:
-                d = v - item["values"][idx - 2]
-            rows.append({"level_index": idx, "value": v, "diff_to_prev": d, "is_jump": False})
-        a = analyze(item["values"], jump_threshold)
-        for jp in a["jump_points"]:
-            if 1 <= jp <= len(rows):
-                rows[jp - 1]["is_jump"] = True
-        replace_values(session, series_id, rows)
-        upsert_analysis(session, series_id, a, json.dumps(a["jump_points"]))
-        series_out.append({"series_id": series_id, "skill_id": sid, "label": label, "units": item["units"], "meta": {}})
-        values_out[series_id] = rows
-        analyses_out[series_id] = a
-    return series_out, values_out, analyses_out
-
-
-def run(input_fp: Path, site_dir: Path, db_path: Path, jump_threshold: float, cname: Optional[str] = None) -> None:
+        label = unique_label(store, item.label)
+        store[label] = item.values
+        series_out.append(Series(f"{sid}:{label}", sid, label, item.units, item.values, analyze(item.values, jump_threshold), sequence_family(item)))
+    return series_out
+
+
+def process_skill(name: str, sid: str, start: int, end: int, block: str, jump_threshold: float, texts: Optional[TextDictionary] = None) -> Skill:
+    seqs = extract_sequences(block)
+    if texts is None:
+        texts = TextDictionary()
+    desc = extract_description(block)
+    skill = Skill(
+        skill_id=sid,
+        name=name,
+        start=start,
+        end=end,
+        meta=compute_skill_meta(block),
+        description_ids=texts.intern_all(desc.split("\n")) if desc else [],
+        effect_ids=texts.intern_all(extract_special_effects(block)),
+        full_text=block,
+        groups=build_groups_from_sequences(seqs),
+    )
+    skill.series = build_series_for_skill(sid, seqs, jump_threshold)
+    return skill
+
+
+def source_span_json(skill: Skill) -> str:
+    # 不存 start/end：前面的技能长度一变，后面所有块的偏移都会变，存进库里就得整片重写
+    return json.dumps({"meta": skill.meta, "description_ids": skill.description_ids, "effect_ids": skill.effect_ids, "full_text": skill.full_text, "groups": skill.groups_json()})
+
+
+def text_refs(skill: Skill) -> List[Dict[str, Any]]:
+    refs = [{"skill_id": skill.skill_id, "text_id": t, "kind": "description", "position": i} for i, t in enumerate(skill.description_ids)]
+    refs.extend({"skill_id": skill.skill_id, "text_id": t, "kind": "effect", "position": i} for i, t in enumerate(skill.effect_ids))
+    return refs
+
+
+def write_skill(session, skill: Skill, texts: TextDictionary) -> None:
+    insert_texts(session, texts.pending())
+    upsert_skill(session, skill.skill_id, skill.name, source_span_json(skill))
+    replace_skill_texts(session, skill.skill_id, text_refs(skill))
+    for x in skill.series:
+        upsert_series(session, x.series_id, x.skill_id, x.label, x.units, json.dumps({}), x.family)
+        replace_values(session, x.series_id, x.iter_rows())
+        upsert_analysis(session, x.series_id, x.analysis)
+
+
+def skill_rows(skills: List[Skill]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # 同一批中重复的技能编号/序列标识以最后一次为准（与逐条 upsert 的结果一致）
+    skill_map: Dict[str, Dict[str, Any]] = {}
+    refs_map: Dict[str, List[Dict[str, Any]]] = {}
+    series_map: Dict[str, Series] = {}
+    for sk in skills:
+        skill_map[sk.skill_id] = {"skill_id": sk.skill_id, "name": sk.name, "source_span": source_span_json(sk)}
+        refs_map[sk.skill_id] = text_refs(sk)
+        for x in sk.series:
+            series_map[x.series_id] = x
+    series_rows: List[Dict[str, Any]] = []
+    value_rows: List[Dict[str, Any]] = []
+    analysis_rows: List[Dict[str, Any]] = []
+    for x in series_map.values():
+        a = x.analysis
+        series_rows.append({"series_id": x.series_id, "skill_id": x.skill_id, "label": x.label, "units": x.units, "family": x.family, "meta": json.dumps({})})
+        value_rows.extend({"series_id": x.series_id, "level_index": i, "value": v, "diff_to_prev": d, "is_jump": 1 if j else 0} for i, v, d, j in x.iter_rows())
+        analysis_rows.append({"series_id": x.series_id, "is_linear": 1 if a.is_linear else 0, "trend": a.trend or "mixed", "min": a.min, "max": a.max, "count": a.count, "jump_points": json.dumps(a.jump_points)})
+    return list(skill_map.values()), series_rows, value_rows, analysis_rows, [r for refs in refs_map.values() for r in refs]
+
+
+def write_batch(session, skills: List[Skill], texts: TextDictionary) -> None:
+    # 本批技能引用的新文本在解析时已进入字典，先于引用写入
+    insert_texts(session, texts.pending())
+    replace_skills_bulk(session, *skill_rows(skills))
+
+
+def export_results(site_dir: Path, skills: List[Skill], texts: TextDictionary, cache: Optional[Dict[Path, Any]] = None, db_path: Optional[Path] = None, keep: int = KEEP_GENERATIONS) -> str:
+    return export_all(site_dir, skills, texts, cache, db_path, keep)
+
+
+class _Stage(threading.Thread):
+    """
+    流水线中的一个消费者线程：从有界队列取批次交给 handle，收到 None 结束。
+    handle 出错后记录异常并继续取空队列，避免生产者在 put 上永久阻塞。
+    """
+
+    def __init__(self, name: str, handle: Callable[[List[Skill]], None], depth: int):
+        super().__init__(name=name, daemon=True)
+        self.queue: "queue.Queue[Optional[List[Skill]]]" = queue.Queue(maxsize=depth)
+        self.handle = handle
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is None:
+                try:
+                    self.handle(batch)
+                except BaseException as e:
+                    self.error = e
+
+
+def run(input_fp: Path, site_dir: Path, db_path: Path, jump_threshold: float, cname: Optional[str] = None, batch_size: int = BATCH_SIZE, depth: int = PIPELINE_DEPTH, keep: int = KEEP_GENERATIONS) -> List[Skill]:
+    """
+    流水线构建：主线程解析并按 batch_size 个技能打包，分别放入写库线程和导出线程的有界队列。
+    写库线程每批一次 executemany 并提交，导出线程同时把记录转换成 JSON 片段；
+    全部批次处理完后再写出聚合文件和静态库。
+
+    写库写的是当前库的副本，站点数据写进新一代目录，全部完成后才分别原子切换，
+    构建期间读者看到的始终是上一次完整构建的结果；各保留 keep 代旧结果用于回滚。
+    """
     text = read_text(input_fp)
     skills_blocks = find_skills(text)
     ensure_dir(site_dir)
+    building = stage_db(db_path)
+    try:
+        results = _run_pipeline(text, skills_blocks, site_dir, building, jump_threshold, batch_size, depth, keep)
+    except BaseException:
+        building.unlink(missing_ok=True)
+        raise
+    publish_db(building, db_path, keep)
+    return results
+
+
+def _run_pipeline(text: str, skills_blocks: List[Tuple[str, str, int, int]], site_dir: Path, db_path: Path, jump_threshold: float, batch_size: int, depth: int, keep: int) -> List[Skill]:
     session = get_session(db_path)
-    skills_out: List[Dict[str, Any]] = []
-    series_out: List[Dict[str, Any]] = []
-    values_out: Dict[str, List[Dict[str, Any]]] = {}
-    analyses_out: Dict[str, Dict[str, Any]] = {}
-    for name, sid, start, end in skills_blocks:
-        block = text[start:end]
-        seqs = extract_sequences(block)
-        desc = extract_description(block)
-        effects = extract_special_effects(block)
-        groups = build_groups_from_sequences(seqs)
-        skill_meta = compute_skill_meta(block)
-        upsert_skill(session, sid, name, json.dumps({"start": start, "end": end, "meta": skill_meta, "description": desc, "desc_template": desc, "special_effects": effects, "full_text": block, "groups": groups}))
-        skills_out.append({"skill_id": sid, "name": name, "meta": skill_meta, "description": desc, "desc_template": desc, "special_effects": effects, "full_text": block, "groups": groups})
-        s_out, v_out, a_out = build_series_for_skill(session, sid, seqs, jump_threshold)
-        series_out.extend(s_out)
-        values_out.update(v_out)
-        analyses_out.update(a_out)
+    texts = load_texts(session)
+    # 结束读事务，归还主线程取得的连接；之后由写库线程重新取连接
     session.commit()
-    session.close()
-    export_all(site_dir, skills_out, series_out, values_out, analyses_out)
+    collector = ExportCollector()
+
+    def write(batch: List[Skill]) -> None:
+        write_batch(session, batch, texts)
+        session.commit()
+
+    writer = _Stage("db-writer", write, depth)
+    exporter = _Stage("exporter", collector.add, depth)
+    writer.start()
+    exporter.start()
+    results: List[Skill] = []
+    try:
+        batch: List[Skill] = []
+        for name, sid, start, end in skills_blocks:
+            batch.append(process_skill(name, sid, start, end, text[start:end], jump_threshold, texts))
+            if len(batch) >= batch_size:
+                writer.queue.put(batch)
+                exporter.queue.put(batch)
+                results.extend(batch)
+                batch = []
+        if batch:
+            writer.queue.put(batch)
+            exporter.queue.put(batch)
+            results.extend(batch)
+        writer.queue.put(None)
+        exporter.queue.put(None)
+        writer.join()
+        exporter.join()
+        for stage in (writer, exporter):
+            if stage.error is not None:
+                raise stage.error
+        # 整库重建时所有序列都变了，聚合表整体重算
+        refresh_aggregates(session)
+        session.commit()
+    finally:
+        # 解析出错时也要让两个线程退出，再关闭会话
+        for stage in (writer, exporter):
+            if stage.is_alive():
+                stage.queue.put(None)
+                stage.join()
+        session.close()
+    collector.finish(site_dir, texts, db_path=db_path, keep=keep)
+    return results
 
 
 def copy_frontend(site_dir: Path, cname: Optional[str]) -> None:
@@ -120,15 +241,24 @@ def copy_frontend(site_dir: Path, cname: Optional[str]) -> None:
         (site_dir / "CNAME").write_text(cname.strip(), encoding="utf-8")
 
 
+def profile_memory(input_fp: Path, site_dir: Path, db_path: Path, jump_threshold: float, cname: Optional[str] = None, keep: int = KEEP_GENERATIONS) -> None:
+    import tracemalloc
+    tracemalloc.start()
+    results = run(input_fp, site_dir, db_path, jump_threshold, cname, keep=keep)
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    live = snapshot.statistics("filename")
+    print(f"skills={len(results)} series={sum(len(s.series) for s in results)}")
+    print(f"peak traced memory: {peak / 1024:.0f} KiB")
+    print(f"live after build: {sum(x.size for x in live) / 1024:.0f} KiB in {sum(x.count for x in live)} blocks")
+
+
 def main() -> None:
-    p = argparse.ArgumentParser()
-    p.add_argument("--input", default="1.txt")
-    p.add_argument("--site-dir", default="docs")
-    p.add_argument("--db-path", default="skill_report.db")
-    p.add_argument("--jump-threshold", type=float, default=2.0)
-    p.add_argument("--cname", default=None)
-    args = p.parse_args()
-    run(Path(args.input), Path(args.site_dir), Path(args.db_path), args.jump_threshold, args.cname)
+    # 兼容旧入口：python -m skill_growth_report.build [参数] 等价于 skill-growth-report build [参数]
+    import sys
+    from .cli import main as cli_main
+    cli_main(["build", *sys.argv[1:]])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,101 @@
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from .models import Sequence, Skill
+
+PERCENTILES = (10, 25, 50, 75, 90)
+TOP_OUTLIERS = 5
+
+_SUFFIX_RE = re.compile(r"#\d+$")
+
+
+# 序列族 = 动作 + 资源（或伤害类型），如 消耗精神、回复精神、造成精神打击、造成外功伤害。
+# 只按标签分会把同名的消耗、回复、偷取序列混在一起统计，分位数和离群判断都没有意义
+GROUP_ACTIONS = {"consume": "消耗", "recover": "回复", "deal": "造成"}
+_POOLS = ("精神", "耐力", "气血", "内力")
+
+
+def label_family(label: str) -> str:
+    return _SUFFIX_RE.sub("", label)
+
+
+def sequence_group(seq: Sequence) -> Optional[Tuple[str, str]]:
+    """序列在技能 groups 中的位置 (consume/recover/deal, 资源或伤害类型)；不归入任何分组时返回 None。"""
+    act = seq.action
+    res = seq.resource or ""
+    if act == "消耗" and res in _POOLS:
+        return "consume", res
+    if act in ("回复", "恢复") and res in _POOLS:
+        return "recover", res
+    if seq.label.endswith("伤害"):
+        return "deal", seq.label
+    if act == "造成" and res in ("精神", "耐力"):
+        return "deal", res + "打击"
+    return None
+
+
+def sequence_family(seq: Sequence) -> str:
+    group = sequence_group(seq)
+    if group is None:
+        # 不归入分组的序列按 动作 + 标签 单独成族
+        return ("回复" if seq.action == "恢复" else seq.action) + label_family(seq.label)
+    return GROUP_ACTIONS[group[0]] + group[1]
+
+
+def percentile(sorted_vals: List[float], p: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    k = (len(sorted_vals) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def level_bands(curves: List[List[float]]) -> Dict[str, List[Optional[float]]]:
+    max_len = max((len(c) for c in curves), default=0)
+    bands: Dict[str, List[Optional[float]]] = {f"p{p}": [] for p in PERCENTILES}
+    bands["count"] = []
+    for i in range(max_len):
+        col = sorted(c[i] for c in curves if i < len(c))
+        for p in PERCENTILES:
+            v = percentile(col, p)
+            bands[f"p{p}"].append(round(v, 2) if v is not None else None)
+        bands["count"].append(len(col))
+    return bands
+
+
+def outlier_score(curve: List[float], bands: Dict[str, List[Optional[float]]]) -> float:
+    score = 0.0
+    for i, v in enumerate(curve):
+        med = bands["p50"][i]
+        spread = max((bands["p75"][i] or 0) - (bands["p25"][i] or 0), abs(med or 0) * 0.1, 1e-9)
+        score = max(score, abs(v - (med or 0)) / spread)
+    return score
+
+
+def build_chart_aggregates(skills: List[Skill], top_n: int = TOP_OUTLIERS) -> Dict[str, Any]:
+    members: Dict[str, List[Dict[str, Any]]] = {}
+    for s in skills:
+        for x in s.series:
+            if not x.values:
+                continue
+            # 按 动作+资源 分族：同一标签的消耗、回复、偷取序列量级不同，不能放进同一组分位带
+            members.setdefault(x.family or label_family(x.label), []).append({
+                "series_id": x.series_id,
+                "name": f"{s.name} {x.label}",
+                "value": x.values.tolist(),
+                "diff": x.diffs(),
+            })
+    families: List[Dict[str, Any]] = []
+    for family, items in members.items():
+        entry: Dict[str, Any] = {"family": family, "series_count": len(items)}
+        for kind in ("value", "diff"):
+            bands = level_bands([it[kind] for it in items])
+            scored = sorted(items, key=lambda it: outlier_score(it[kind], bands), reverse=True)
+            entry[kind] = {
+                "bands": bands,
+                "outliers": [{"series_id": it["series_id"], "name": it["name"], "data": it[kind]} for it in scored[:top_n]],
+            }
+        families.append(entry)
+    families.sort(key=lambda f: (-f["series_count"], f["family"]))
+    return {"percentiles": list(PERCENTILES), "families": families}
@@ -0,0 +1,178 @@
+import argparse
+import importlib
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# 命令行入口。这里只导入标准库：各子命令需要的模块在执行时才导入，
+# 只读的 export/stats/query 完全不会加载 SQLAlchemy。
+
+_T0 = time.perf_counter()
+_IMPORTS: List[Tuple[str, float, int]] = []
+
+
+def lazy(name: str):
+    t = time.perf_counter()
+    before = len(sys.modules)
+    mod = importlib.import_module(name, __package__)
+    _IMPORTS.append((name, time.perf_counter() - t, len(sys.modules) - before))
+    return mod
+
+
+def print_import_profile() -> None:
+    total = time.perf_counter() - _T0
+    out = sys.stderr
+    print("import profile:", file=out)
+    for name, sec, count in _IMPORTS:
+        print(f"  {name:<14} {sec * 1000:8.1f} ms  +{count} modules", file=out)
+    print(f"  sqlalchemy loaded: {'sqlalchemy' in sys.modules}, numpy loaded: {'numpy' in sys.modules}", file=out)
+    print(f"  total since cli import: {total * 1000:.1f} ms (python -X importtime 可看逐模块明细)", file=out)
+
+
+def cmd_build(args: argparse.Namespace) -> None:
+    build = lazy(".build")
+    if args.watch:
+        lazy(".watch").watch(Path(args.input), Path(args.site_dir), Path(args.db_path), args.jump_threshold, args.watch_interval, args.debounce, args.keep_generations)
+    elif args.profile_memory:
+        build.profile_memory(Path(args.input), Path(args.site_dir), Path(args.db_path), args.jump_threshold, args.cname, args.keep_generations)
+    else:
+        build.run(Path(args.input), Path(args.site_dir), Path(args.db_path), args.jump_threshold, args.cname, keep=args.keep_generations)
+
+
+def cmd_export(args: argparse.Namespace) -> None:
+    reader = lazy(".reader")
+    export = lazy(".export")
+    site_dir = Path(args.site_dir)
+    export.ensure_dir(site_dir)
+    skills, texts = reader.load_skills(Path(args.db_path))
+    gen = export.export_all(site_dir, skills, texts, db_path=Path(args.db_path) if args.static_db else None, keep=args.keep_generations)
+    print(f"published generation {gen}")
+
+
+def cmd_rollback(args: argparse.Namespace) -> None:
+    generations = lazy(".generations")
+    if not args.db_only:
+        store = generations.GenerationStore(Path(args.site_dir) / "data", args.keep_generations)
+        print(f"site data -> generation {store.rollback(args.generation)}")
+    if not args.site_only:
+        prev = generations.rollback_db(Path(args.db_path), args.keep_generations)
+        print(f"{args.db_path} <- {prev.name}")
+
+
+def cmd_stats(args: argparse.Namespace) -> None:
+    reader = lazy(".reader")
+    if args.family:
+        data = reader.family_stats(Path(args.db_path), args.family, args.level)
+    else:
+        data = reader.stats(Path(args.db_path))
+    print(json.dumps(data, ensure_ascii=False, indent=2))
+
+
+def cmd_query(args: argparse.Namespace) -> None:
+    reader = lazy(".reader")
+    if args.text:
+        for r in reader.skills_with_text(Path(args.db_path), args.text):
+            print(f"{r['skill_id']} {r['name']} {r['kind']}#{r['position']}")
+        return
+    if not args.skill:
+        raise SystemExit("query: 需要技能编号/名称，或 --text")
+    rows = reader.query_series(Path(args.db_path), args.skill, args.label)
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False))
+        return
+    for r in rows:
+        vals = " / ".join(f"{v:.15g}" for v in r["values"])
+        print(f"{r['skill_id']} {r['name']} {r['label']}: {vals}")
+
+
+def cmd_parsebench(args: argparse.Namespace) -> None:
+    parsebench = lazy(".parsebench")
+    if args.record:
+        parsebench.record_golden(parsebench.read_text(Path(args.input)), Path(args.golden), args.jump_threshold)
+        print(f"golden snapshot recorded: {args.golden}")
+        return
+    report = parsebench.run(Path(args.input), Path(args.golden), args.jump_threshold, args.scale, args.seed, args.rounds, args.mutation)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        parsebench.print_report(report)
+    if not report["ok"]:
+        raise SystemExit(1)
+
+
+def make_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="skill-growth-report")
+    p.add_argument("--profile-imports", action="store_true", help="在 stderr 输出各子命令模块的导入耗时")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    pb = sub.add_parser("build", help="解析文本、写库并导出站点数据")
+    pb.add_argument("--input", default="1.txt")
+    pb.add_argument("--site-dir", default="docs")
+    pb.add_argument("--db-path", default="skill_report.db")
+    pb.add_argument("--jump-threshold", type=float, default=2.0)
+    pb.add_argument("--cname", default=None)
+    pb.add_argument("--watch", action="store_true", help="常驻内存，输入文件变化后只重建变化的技能")
+    pb.add_argument("--watch-interval", type=float, default=0.2)
+    pb.add_argument("--debounce", type=float, default=0.3)
+    pb.add_argument("--profile-memory", action="store_true", help="用 tracemalloc 统计构建的峰值内存和解析结果占用的内存块数")
+    pb.add_argument("--keep-generations", type=int, default=3, help="站点数据与库各保留几代旧结果用于回滚")
+    pb.set_defaults(func=cmd_build)
+
+    pe = sub.add_parser("export", help="从已构建的库重新导出站点数据（不重新解析）")
+    pe.add_argument("--site-dir", default="docs")
+    pe.add_argument("--db-path", default="skill_report.db")
+    pe.add_argument("--static-db", action="store_true", help="同时重新生成 data/report.sqlite3（否则沿用上一代的）")
+    pe.add_argument("--keep-generations", type=int, default=3)
+    pe.set_defaults(func=cmd_export)
+
+    pr = sub.add_parser("rollback", help="站点数据指针与库切回上一代（再次执行即撤销）；预渲染的静态页不分代，不随之回滚")
+    pr.add_argument("--site-dir", default="docs")
+    pr.add_argument("--db-path", default="skill_report.db")
+    pr.add_argument("--generation", default=None, help="站点数据切到指定代号（见 data/current.json 的 history）")
+    pr.add_argument("--keep-generations", type=int, default=3)
+    only = pr.add_mutually_exclusive_group()
+    only.add_argument("--site-only", action="store_true")
+    only.add_argument("--db-only", action="store_true")
+    pr.set_defaults(func=cmd_rollback)
+
+    ps = sub.add_parser("stats", help="输出库的统计信息")
+    ps.add_argument("--db-path", default="skill_report.db")
+    ps.add_argument("--family", default=None, help="只看某个序列族（动作+资源，如 消耗精神、回复精神、造成外功伤害）的物化聚合")
+    ps.add_argument("--level", type=int, default=None, help="配合 --family，只取该级次")
+    ps.set_defaults(func=cmd_stats)
+
+    pp = sub.add_parser("parsebench", help="解析结果与已发布数据比对，并统计各提取函数的吞吐")
+    pp.add_argument("--input", default="1.txt")
+    pp.add_argument("--golden", default="parsebench_golden.json", help="冻结的黄金快照文件（构建不会改写它）")
+    pp.add_argument("--record", action="store_true", help="按当前解析结果重新记录黄金快照（确认变化符合预期后再用）")
+    pp.add_argument("--jump-threshold", type=float, default=2.0)
+    pp.add_argument("--scale", type=int, default=20, help="变换语料放大的份数")
+    pp.add_argument("--seed", type=int, default=0)
+    pp.add_argument("--rounds", type=int, default=3, help="每个函数计时的次数，取最短")
+    pp.add_argument("--mutation", action="append", choices=["repeat", "shuffle", "truncate", "malformed"], help="只跑指定的变换（可重复）")
+    pp.add_argument("--json", action="store_true")
+    pp.set_defaults(func=cmd_parsebench)
+
+    pq = sub.add_parser("query", help="按技能编号或名称查询序列")
+    pq.add_argument("skill", nargs="?", default=None, help="技能编号或名称（名称按子串匹配）")
+    pq.add_argument("label", nargs="?", default=None, help="序列标签，如 外功伤害")
+    pq.add_argument("--db-path", default="skill_report.db")
+    pq.add_argument("--json", action="store_true")
+    pq.add_argument("--text", default=None, help="列出共用这条描述行/特殊效果的技能")
+    pq.set_defaults(func=cmd_query)
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = make_parser().parse_args(argv)
+    try:
+        args.func(args)
+    finally:
+        if args.profile_imports:
+            print_import_profile()
+
+
+if __name__ == "__main__":
+    main()
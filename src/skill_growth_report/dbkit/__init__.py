@@ -1,2 +1,2 @@
-from .base import get_session
-from .crud import upsert_skill, upsert_series, replace_values, upsert_analysis
+from .base import get_session, get_history_session
+from .crud import upsert_skill, upsert_series, replace_values, upsert_analysis, delete_skill, delete_series, replace_skills_bulk, load_texts, insert_texts, replace_skill_texts
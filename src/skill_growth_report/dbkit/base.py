@@ -3,11 +3,46 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 
 Base = declarative_base()
+# 多版本历史库（history.py）的表单独一套元数据：报告库和静态库里不会出现空的历史表，
+# 历史库里也不会建报告表
+HistoryBase = declarative_base()
 
+# 表结构版本，记录在 SQLite 的 PRAGMA user_version 中；修改 dbkit.models 时递增
+SCHEMA_VERSION = 4
+HISTORY_SCHEMA_VERSION = 1
 
-def get_session(db_path: Path) -> Session:
+
+def _migrate_report(conn) -> None:
+    # 第 4 版：series 增加 family 列，聚合表改按 family（动作+资源）分组。
+    # 旧库补列，值在下次写入该序列时填上；旧的按标签分组的聚合行清掉，由下次构建重算
+    cols = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(series)")}
+    if cols and "family" not in cols:
+        conn.exec_driver_sql("ALTER TABLE series ADD COLUMN family VARCHAR NOT NULL DEFAULT ''")
+        for table in ("agg_levels", "agg_families"):
+            if conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).first():
+                conn.exec_driver_sql(f"DELETE FROM {table}")
+
+
+def _open_session(db_path: Path, base, version: int, migrate=None) -> Session:
     from . import models  # noqa
     engine = create_engine(f"sqlite:///{db_path}", future=True)
-    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        current = conn.exec_driver_sql("PRAGMA user_version").scalar()
+    # 版本一致时跳过 create_all（它会对每张表、每个索引逐一查询元数据）
+    if current != version:
+        if migrate is not None:
+            with engine.begin() as conn:
+                migrate(conn)
+        base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {version}")
     SessionLocal = sessionmaker(bind=engine, future=True)
     return SessionLocal()
+
+
+def get_session(db_path: Path) -> Session:
+    return _open_session(db_path, Base, SCHEMA_VERSION, _migrate_report)
+
+
+def get_history_session(db_path: Path) -> Session:
+    return _open_session(db_path, HistoryBase, HISTORY_SCHEMA_VERSION)
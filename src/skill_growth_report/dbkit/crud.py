@@ -1,7 +1,10 @@
-from typing import Iterable, Dict, Any
+import json
+from typing import Iterable, Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from .models import Skill, Series, Value, Analysis
+from sqlalchemy import select, insert
+from .models import Skill, Series, Value, Analysis, TextEntry, SkillText
+from ..models import Analysis as AnalysisRecord
+from ..textdict import TextDictionary, text_digest
 
 
 def upsert_skill(session: Session, skill_id: str, name: str, source_span: str) -> None:
@@ -14,46 +17,93 @@ def upsert_skill(session: Session, skill_id: str, name: str, source_span: str) -
         obj.source_span = source_span
 
 
-def upsert_series(session: Session, series_id: str, skill_id: str, label: str, units: str, meta_json: str) -> None:
+def upsert_series(session: Session, series_id: str, skill_id: str, label: str, units: str, meta_json: str, family: str = "") -> None:
     obj = session.execute(select(Series).where(Series.series_id == series_id)).scalar_one_or_none()
     if obj is None:
-        obj = Series(series_id=series_id, skill_id=skill_id, label=label, units=units, meta=meta_json)
+        obj = Series(series_id=series_id, skill_id=skill_id, label=label, units=units, family=family, meta=meta_json)
         session.add(obj)
     else:
         obj.skill_id = skill_id
         obj.label = label
         obj.units = units
+        obj.family = family
         obj.meta = meta_json
 
 
-def replace_values(session: Session, series_id: str, rows: Iterable[Dict[str, Any]]) -> None:
+def replace_values(session: Session, series_id: str, rows: Iterable[Tuple[int, float, Optional[float], bool]]) -> None:
     session.query(Value).filter(Value.series_id == series_id).delete()
-    for r in rows:
-        session.add(
-            Value(
-                series_id=series_id,
-                level_index=r["level_index"],
-                value=r["value"],
-                diff_to_prev=r.get("diff_to_prev"),
-                is_jump=1 if r.get("is_jump") else 0,
-            )
-        )
-
-
-def upsert_analysis(session: Session, series_id: str, a: Dict[str, Any], jump_points_json: str) -> None:
+    params = [
+        {"series_id": series_id, "level_index": idx, "value": v, "diff_to_prev": d, "is_jump": 1 if j else 0}
+        for idx, v, d, j in rows
+    ]
+    if params:
+        session.execute(insert(Value), params)
+
+
+def upsert_analysis(session: Session, series_id: str, a: AnalysisRecord) -> None:
     obj = session.execute(select(Analysis).where(Analysis.series_id == series_id)).scalar_one_or_none()
-    is_linear = 1 if a.get("is_linear") else 0
-    trend = a.get("trend") or "mixed"
-    min_v = a.get("min")
-    max_v = a.get("max")
-    count_v = a.get("count") or 0
+    is_linear = 1 if a.is_linear else 0
+    trend = a.trend or "mixed"
+    jump_points_json = json.dumps(a.jump_points)
     if obj is None:
-        obj = Analysis(series_id=series_id, is_linear=is_linear, trend=trend, min=min_v, max=max_v, count=count_v, jump_points=jump_points_json)
+        obj = Analysis(series_id=series_id, is_linear=is_linear, trend=trend, min=a.min, max=a.max, count=a.count, jump_points=jump_points_json)
         session.add(obj)
     else:
         obj.is_linear = is_linear
         obj.trend = trend
-        obj.min = min_v
-        obj.max = max_v
-        obj.count = count_v
+        obj.min = a.min
+        obj.max = a.max
+        obj.count = a.count
         obj.jump_points = jump_points_json
+
+
+def delete_series(session: Session, series_ids: List[str]) -> None:
+    if not series_ids:
+        return
+    session.query(Value).filter(Value.series_id.in_(series_ids)).delete(synchronize_session=False)
+    session.query(Analysis).filter(Analysis.series_id.in_(series_ids)).delete(synchronize_session=False)
+    session.query(Series).filter(Series.series_id.in_(series_ids)).delete(synchronize_session=False)
+
+
+def load_texts(session: Session) -> TextDictionary:
+    return TextDictionary(t for (t,) in session.execute(select(TextEntry.text).order_by(TextEntry.text_id)))
+
+
+def insert_texts(session: Session, entries: List[Tuple[int, str]]) -> None:
+    if entries:
+        session.execute(insert(TextEntry), [{"text_id": i, "digest": text_digest(t), "text": t} for i, t in entries])
+
+
+def replace_skill_texts(session: Session, skill_id: str, refs: List[Dict[str, Any]]) -> None:
+    session.query(SkillText).filter(SkillText.skill_id == skill_id).delete(synchronize_session=False)
+    if refs:
+        session.execute(insert(SkillText), refs)
+
+
+def delete_skill(session: Session, skill_id: str) -> None:
+    session.query(SkillText).filter(SkillText.skill_id == skill_id).delete(synchronize_session=False)
+    delete_series(session, [sid for (sid,) in session.query(Series.series_id).filter(Series.skill_id == skill_id)])
+    session.query(Skill).filter(Skill.skill_id == skill_id).delete(synchronize_session=False)
+
+
+def replace_skills_bulk(session: Session, skills: List[Dict[str, Any]], series: List[Dict[str, Any]], values: List[Dict[str, Any]], analyses: List[Dict[str, Any]], text_refs: List[Dict[str, Any]]) -> None:
+    """
+    批量替换一组技能及其序列：先删掉这些技能已有的行，再用 executemany 一次性插入。
+    比逐条 upsert 少了每行一次的 SELECT，适合整批写入；调用方负责提交事务。
+    """
+    skill_ids = [s["skill_id"] for s in skills]
+    if not skill_ids:
+        return
+    old = [sid for (sid,) in session.query(Series.series_id).filter(Series.skill_id.in_(skill_ids))]
+    delete_series(session, old + [x["series_id"] for x in series])
+    session.query(SkillText).filter(SkillText.skill_id.in_(skill_ids)).delete(synchronize_session=False)
+    session.query(Skill).filter(Skill.skill_id.in_(skill_ids)).delete(synchronize_session=False)
+    session.execute(insert(Skill), skills)
+    if text_refs:
+        session.execute(insert(SkillText), text_refs)
+    if series:
+        session.execute(insert(Series), series)
+    if values:
+        session.execute(insert(Value), values)
+    if analyses:
+        session.execute(insert(Analysis), analyses)
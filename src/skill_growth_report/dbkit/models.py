@@ -1,6 +1,6 @@
 import uuid
 from sqlalchemy import Column, String, Integer, Float, Text, ForeignKey, Index, UniqueConstraint
-from .base import Base
+from .base import Base, HistoryBase
 
 # 技能表
 # - 主键 `id` 使用 UUID 字符串
@@ -18,6 +18,7 @@ class Skill(Base):
 # - 主键 `id` 使用 UUID 字符串
 # - `series_id` 为业务侧的序列标识（如 `<skill_id>:<label>`），设置为唯一
 # - `skill_id` 仍外键引用技能表中的 `skill_id`（唯一列），保持现有业务入参不变
+# - `family` 为 动作+资源 的序列族（如 消耗精神 / 回复精神 / 造成外功伤害），物化聚合按它分组
 class Series(Base):
     __tablename__ = "series"
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), comment="主键UUID")
@@ -25,9 +26,12 @@ class Series(Base):
     skill_id = Column(String, ForeignKey("skills.skill_id"), nullable=False, comment="关联技能编号（skills.skill_id）")
     label = Column(String, nullable=False, comment="序列标签（规范化）")
     units = Column(String, nullable=False, comment="单位（如 点）")
+    family = Column(String, nullable=False, default="", comment="序列族（动作+资源）")
     meta = Column(Text, comment="序列元数据JSON（预留）")
     __table_args__ = (UniqueConstraint("series_id", name="uq_series_series_id"),)
 
+Index("idx_series_family", Series.family)
+
 # 序列值表
 # - 主键 `id` 使用 UUID 字符串
 # - 每行对应一次级次值（包含差值与跃迁标记）
@@ -56,3 +60,109 @@ class Analysis(Base):
     count = Column(Integer, nullable=False, comment="值数量")
     jump_points = Column(Text, nullable=False, comment="跃迁点索引JSON")
     __table_args__ = (UniqueConstraint("series_id", name="uq_analysis_series_id"),)
+
+# 版本表（多版本历史库，HistoryBase，不进报告库）
+# - 每个版本对应目录中的一份带日期的文本导出
+# - `patch` 为版本名（文件名去后缀），`released` 为从文件名解析出的日期（解析不到时为版本名本身），用于排序
+# - `digest` 为原始文本的 sha1，同名版本内容未变时跳过重复导入
+class Patch(HistoryBase):
+    __tablename__ = "patches"
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), comment="主键UUID")
+    patch = Column(String, nullable=False, comment="版本名（唯一）")
+    released = Column(String, nullable=False, comment="版本日期（YYYY-MM-DD，排序用）")
+    source = Column(String, nullable=False, comment="来源文件名")
+    digest = Column(String, nullable=False, comment="来源文本sha1")
+    __table_args__ = (UniqueConstraint("patch", name="uq_patches_patch"),)
+
+Index("idx_patches_released", Patch.released)
+
+# 序列内容表（按内容寻址）
+# - `digest` 为 单位+数值序列 的 sha1，版本之间没有变化的序列只存一份
+# - `values_json` 为数值数组 JSON，`analysis` 为分析结果 JSON
+class SeriesVersion(HistoryBase):
+    __tablename__ = "series_versions"
+    digest = Column(String, primary_key=True, comment="内容sha1")
+    units = Column(String, nullable=False, comment="单位")
+    values_json = Column(Text, nullable=False, comment="数值数组JSON")
+    count = Column(Integer, nullable=False, comment="值数量")
+    min = Column(Float, comment="最小值")
+    max = Column(Float, comment="最大值")
+    analysis = Column(Text, nullable=False, comment="分析结果JSON")
+
+# 版本-序列映射表
+# - 每个版本里的每条序列一行，只记录指向 series_versions 的 digest
+# - (skill_name, label, released) 与 (series_id, released) 两个索引覆盖“某技能某序列在最近 N 个版本的变化”查询
+class PatchSeries(HistoryBase):
+    __tablename__ = "patch_series"
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), comment="主键UUID")
+    patch_id = Column(String, ForeignKey("patches.id"), nullable=False, comment="关联版本（patches.id）")
+    released = Column(String, nullable=False, comment="版本日期（冗余，便于索引排序）")
+    series_id = Column(String, nullable=False, comment="序列标识（skill_id:label）")
+    skill_id = Column(String, nullable=False, comment="技能编号")
+    skill_name = Column(String, nullable=False, comment="技能名称")
+    label = Column(String, nullable=False, comment="序列标签")
+    digest = Column(String, ForeignKey("series_versions.digest"), nullable=False, comment="序列内容sha1")
+    __table_args__ = (UniqueConstraint("patch_id", "series_id", name="uq_patch_series"),)
+
+Index("idx_patch_series_name_label", PatchSeries.skill_name, PatchSeries.label, PatchSeries.released)
+Index("idx_patch_series_series", PatchSeries.series_id, PatchSeries.released)
+
+# 物化聚合：按序列族（series.family，动作+资源，如 消耗精神 / 回复精神 / 造成外功伤害）和级次统计
+# - 每个 (family, level_index) 一行，查询“精神在第 13 重的平均消耗”（消耗精神, 13）只需一次唯一索引查找
+# - `jump_count` 为该级次被判定为跃迁点的序列数，同一族的所有行即跃迁位置分布
+# - 由 aggregates.refresh_aggregates 按受影响的族整体重算
+class LevelAggregate(Base):
+    __tablename__ = "agg_levels"
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), comment="主键UUID")
+    family = Column(String, nullable=False, comment="序列族")
+    level_index = Column(Integer, nullable=False, comment="级次索引（从1开始）")
+    count = Column(Integer, nullable=False, comment="有该级次的序列数")
+    min = Column(Float, comment="最小值")
+    max = Column(Float, comment="最大值")
+    mean = Column(Float, comment="平均值")
+    p10 = Column(Float, comment="10分位")
+    p25 = Column(Float, comment="25分位")
+    p50 = Column(Float, comment="中位数")
+    p75 = Column(Float, comment="75分位")
+    p90 = Column(Float, comment="90分位")
+    jump_count = Column(Integer, nullable=False, comment="该级次为跃迁点的序列数")
+    __table_args__ = (UniqueConstraint("family", "level_index", name="uq_agg_levels_family_level"),)
+
+# 物化聚合：按序列族（同上）统计趋势与线性
+class FamilyAggregate(Base):
+    __tablename__ = "agg_families"
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), comment="主键UUID")
+    family = Column(String, nullable=False, comment="序列族（唯一）")
+    series_count = Column(Integer, nullable=False, comment="序列数")
+    linear_count = Column(Integer, nullable=False, comment="线性增长序列数")
+    increasing = Column(Integer, nullable=False, comment="递增序列数")
+    decreasing = Column(Integer, nullable=False, comment="递减序列数")
+    mixed = Column(Integer, nullable=False, comment="涨跌混合序列数")
+    with_jumps = Column(Integer, nullable=False, comment="含跃迁点的序列数")
+    max_levels = Column(Integer, nullable=False, comment="最大级数")
+    __table_args__ = (UniqueConstraint("family", name="uq_agg_families_family"),)
+
+# 文本字典表
+# - 描述模板的每一行、每条特殊效果在全库只存一份
+# - `text_id` 为整数编号（与 data/texts.json 的下标一致），技能的 source_span 中只保存这些编号
+# - 按文本查找走 `digest`（文本 sha1 前 16 位）上的唯一索引，避免在索引里再存一份全文
+class TextEntry(Base):
+    __tablename__ = "texts"
+    text_id = Column(Integer, primary_key=True, autoincrement=False, comment="文本编号")
+    digest = Column(String, nullable=False, comment="文本sha1前16位（唯一）")
+    text = Column(Text, nullable=False, comment="文本内容")
+    __table_args__ = (UniqueConstraint("digest", name="uq_texts_digest"),)
+
+# 技能-文本引用表
+# - `kind` 为 description（描述模板行）或 effect（特殊效果），`position` 为在技能内的顺序
+# - 按 text_id 索引，“哪些技能共用这条效果”只需一次索引查找
+class SkillText(Base):
+    __tablename__ = "skill_texts"
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), comment="主键UUID")
+    skill_id = Column(String, ForeignKey("skills.skill_id"), nullable=False, comment="关联技能编号（skills.skill_id）")
+    text_id = Column(Integer, ForeignKey("texts.text_id"), nullable=False, comment="关联文本编号（texts.text_id）")
+    kind = Column(String, nullable=False, comment="description / effect")
+    position = Column(Integer, nullable=False, comment="在技能内的顺序（从0开始）")
+
+Index("idx_skill_texts_text", SkillText.text_id)
+Index("idx_skill_texts_skill", SkillText.skill_id)
@@ -1,60 +1,99 @@
 import json
+import os
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from .models import Skill
+from .textdict import TextDictionary
+from .summary import build_summary_row
+from .charts import build_chart_aggregates
+from .matrix import write_matrix, MATRIX_NAME, LENGTHS_NAME, INDEX_NAME
+from .prerender import prerender_site
+from .static_db import publish_static_db, STATIC_DB_NAME
+from .generations import GenerationStore, KEEP_GENERATIONS
 
 
 def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
 
-def write_json(fp: Path, data: Any) -> None:
-    fp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-
-
-def export_all(site_dir: Path, skills: List[Dict[str, Any]], series: List[Dict[str, Any]], values: Dict[str, List[Dict[str, Any]]], analyses: Dict[str, Dict[str, Any]]) -> None:
-    data_dir = site_dir / "data"
-    ensure_dir(data_dir)
-    skills_out = [{"skill_id": s["skill_id"], "name": s["name"], "meta": s.get("meta", {}), "description": s.get("description", ""), "desc_template": s.get("desc_template", ""), "special_effects": s.get("special_effects", []), "full_text": s.get("full_text", ""), "groups": s.get("groups", {})} for s in skills]
-    write_json(data_dir / "skills.json", skills_out)
-    write_json(
-        data_dir / "series.json",
-        [
-            {
-                "series_id": x["series_id"],
-                "skill_id": x["skill_id"],
-                "label": x["label"],
-                "units": x["units"],
-                "meta": x.get("meta", {}),
-            }
-            for x in series
-        ],
-    )
-    write_json(
-        data_dir / "values.json",
-        {
-            sid: [
-                {
-                    "level_index": v["level_index"],
-                    "value": v["value"],
-                    "diff_to_prev": v.get("diff_to_prev"),
-                    "is_jump": v.get("is_jump", False),
-                }
-                for v in lst
-            ]
-            for sid, lst in values.items()
-        },
-    )
-    write_json(
-        data_dir / "analysis.json",
-        {
-            sid: {
-                "is_linear": a.get("is_linear", False),
-                "trend": a.get("trend", "mixed"),
-                "min": a.get("min"),
-                "max": a.get("max"),
-                "count": a.get("count", 0),
-                "jump_points": a.get("jump_points", []),
-            }
-            for sid, a in analyses.items()
-        },
-    )
+def write_text(fp: Path, text: str, cache: Optional[Dict[Path, Any]] = None) -> bool:
+    if cache is not None and cache.get(fp) == text:
+        return False
+    # 先写临时文件再替换：读者不会读到写了一半的文件，也不会改动与上一代共用的硬链接
+    tmp = fp.with_name(fp.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, fp)
+    if cache is not None:
+        cache[fp] = text
+    return True
+
+
+def write_json(fp: Path, data: Any, cache: Optional[Dict[Path, Any]] = None) -> bool:
+    return write_text(fp, json.dumps(data, ensure_ascii=False, indent=2), cache)
+
+
+class ExportCollector:
+    """
+    逐批接收技能记录并立即转换出各文件的 JSON 片段，finish() 时再计算聚合数据并落盘。
+    构建流水线中由导出线程持有，与解析、写库同时进行。
+    """
+
+    def __init__(self) -> None:
+        self.skills: List[Skill] = []
+        self.skills_json: List[Dict[str, Any]] = []
+        self.summary: List[Dict[str, Any]] = []
+        self.series_json: List[Dict[str, Any]] = []
+        self.values_json: Dict[str, List[Dict[str, Any]]] = {}
+        self.analysis_json: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, skills: List[Skill]) -> None:
+        for s in skills:
+            self.skills.append(s)
+            self.skills_json.append(s.to_json())
+            self.summary.append(build_summary_row(s))
+            for x in s.series:
+                self.series_json.append(x.to_json())
+                self.values_json[x.series_id] = x.rows_json()
+                self.analysis_json[x.series_id] = x.analysis.to_json()
+
+    def finish(self, site_dir: Path, texts: TextDictionary, cache: Optional[Dict[Path, Any]] = None, db_path: Optional[Path] = None, keep: int = KEEP_GENERATIONS) -> str:
+        """
+        数据文件写进新一代目录后整体发布（见 generations）；db_path 不为空时同时重新生成该代的静态库，
+        否则沿用上一代的。返回发布的代号。
+
+        预渲染的静态页（index.html 中的列表、skills/*.html）不属于代：它们的 URL 要保持固定，
+        在新一代发布之后原地更新（同样先写临时文件再替换）。回滚只切换数据与库，这些页面保持最近一次构建的内容，
+        它们只是无 JS 时的降级展示，交互应用加载当前代数据后会替换列表。
+        """
+        store = GenerationStore(site_dir / "data", keep)
+        data_dir = store.stage()
+        # 描述模板行/特殊效果的字典，skills.json 与 summary.json 中的 *_ids 是它的下标
+        write_json(data_dir / "texts.json", texts.texts, cache)
+        write_json(data_dir / "skills.json", self.skills_json, cache)
+        write_json(data_dir / "summary.json", self.summary, cache)
+        write_json(data_dir / "series.json", self.series_json, cache)
+        write_json(data_dir / "values.json", self.values_json, cache)
+        write_json(data_dir / "analysis.json", self.analysis_json, cache)
+        write_json(data_dir / "charts.json", build_chart_aggregates(self.skills), cache)
+        if not write_matrix(data_dir, [x for s in self.skills for x in s.series], cache):
+            # 没有 numpy 时不写矩阵；stage() 硬链接过来的上一代矩阵必须删掉，否则新一代会带着旧数值发布
+            for name in (MATRIX_NAME, LENGTHS_NAME, INDEX_NAME):
+                (data_dir / name).unlink(missing_ok=True)
+                if cache is not None:
+                    cache.pop(data_dir / name, None)
+        if db_path is not None:
+            publish_static_db(db_path, data_dir / STATIC_DB_NAME)
+        gen = store.publish(data_dir)
+        # 无 JS 可用的静态列表与单技能页
+        removed = prerender_site(site_dir, self.skills, self.summary, texts, lambda fp, text: write_text(fp, text, cache))
+        if cache is not None:
+            for fp in removed:
+                cache.pop(fp, None)
+        return gen
+
+
+def export_all(site_dir: Path, skills: List[Skill], texts: TextDictionary, cache: Optional[Dict[Path, Any]] = None, db_path: Optional[Path] = None, keep: int = KEEP_GENERATIONS) -> str:
+    collector = ExportCollector()
+    collector.add(skills)
+    return collector.finish(site_dir, texts, cache, db_path, keep)
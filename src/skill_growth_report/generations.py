@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 构建产物按“代”发布，读者任何时候看到的都是某一次完整构建的结果：
+# - 站点数据（多个文件）：每次写进新的代目录 data/generations/<代号>/，写完后原子替换
+#   data/current.json 指针；前端先读指针再取该代的文件，旧代保留 keep 个供回滚和在途读者使用。
+# - 库（单个文件）：在旁边的新文件里构建，完成后 os.replace 到 db_path；
+#   被替换下来的旧库移到 <db_path>.generations/ 下，同样保留 keep 个。
+# - 预渲染的静态页（index.html、skills/*.html）不分代，URL 固定，每次发布后原地更新，回滚时不随之切换。
+
+KEEP_GENERATIONS = 3
+GENERATIONS_DIR = "generations"
+CURRENT_NAME = "current.json"
+
+
+def _replace_json(fp: Path, data: Any) -> None:
+    tmp = fp.with_name(fp.name + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, fp)
+
+
+def _digest_dir(d: Path) -> str:
+    h = hashlib.sha1()
+    for fp in sorted(p for p in d.rglob("*") if p.is_file()):
+        h.update(fp.relative_to(d).as_posix().encode("utf-8") + b"\0")
+        with open(fp, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+class GenerationStore:
+    """
+    root（站点的 data 目录）下的代目录与指针。
+
+        store = GenerationStore(site_dir / "data")
+        d = store.stage()        # 新代的暂存目录，预先硬链接当前代的文件
+        ...写文件（必须先写临时文件再 os.replace，不能原地改写硬链接）...
+        store.publish(d)         # 按内容命名代目录并切换指针，清理多余的旧代
+
+    代号是内容摘要：内容没变时发布到已有的同一代，指针不动。
+    """
+
+    def __init__(self, root: Path, keep: int = KEEP_GENERATIONS):
+        self.root = root
+        self.keep = keep
+        self.gen_root = root / GENERATIONS_DIR
+
+    def pointer(self) -> Dict[str, Any]:
+        fp = self.root / CURRENT_NAME
+        if not fp.exists():
+            return {}
+        return json.loads(fp.read_text(encoding="utf-8"))
+
+    def current(self) -> Optional[str]:
+        return self.pointer().get("generation")
+
+    def path(self, gen: str) -> Path:
+        return self.gen_root / gen
+
+    def current_dir(self) -> Path:
+        """当前代的目录；还没有发布过任何一代时是 root 本身（旧的平铺布局）。"""
+        gen = self.current()
+        return self.path(gen) if gen else self.root
+
+    def stage(self) -> Path:
+        # 同一进程固定用同一个暂存目录，watch 模式下导出缓存的路径键在多次发布之间保持有效
+        staged = self.gen_root / f".stage-{os.getpid()}"
+        if staged.exists():
+            shutil.rmtree(staged)
+        staged.mkdir(parents=True)
+        gen = self.current()
+        if gen:
+            src = self.path(gen)
+            for fp in src.rglob("*"):
+                if fp.is_file():
+                    dst = staged / fp.relative_to(src)
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    try:
+                        os.link(fp, dst)
+                    except OSError:  # 不支持硬链接的文件系统
+                        shutil.copy2(fp, dst)
+        return staged
+
+    def publish(self, staged: Path) -> str:
+        gen = _digest_dir(staged)
+        target = self.path(gen)
+        if target.exists():
+            shutil.rmtree(staged)
+        else:
+            os.rename(staged, target)
+        old = self.pointer()
+        if old.get("generation") != gen:
+            self._point([gen] + [g for g in old.get("history", []) if g != gen])
+        return gen
+
+    def rollback(self, gen: Optional[str] = None) -> str:
+        """把指针切回 gen（默认上一代）；不带参数再次回滚即回到原来那一代。"""
+        history: List[str] = self.pointer().get("history", [])
+        if gen is None:
+            if len(history) < 2:
+                raise ValueError("没有可回滚的上一代")
+            gen = history[1]
+        if gen not in history or not self.path(gen).exists():
+            raise ValueError(f"代不存在: {gen}")
+        self._point([gen] + [g for g in history if g != gen])
+        return gen
+
+    def _point(self, history: List[str]) -> None:
+        kept, dropped = history[:self.keep + 1], history[self.keep + 1:]
+        _replace_json(self.root / CURRENT_NAME, {
+            "generation": kept[0],
+            "path": f"{GENERATIONS_DIR}/{kept[0]}/",
+            "published_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "history": kept,
+        })
+        # 指针切换之后再删旧代，拿到旧指针的读者还能读完
+        for g in dropped:
+            shutil.rmtree(self.path(g), ignore_errors=True)
+
+
+def db_generations_dir(db_path: Path) -> Path:
+    return db_path.with_name(db_path.name + "." + GENERATIONS_DIR)
+
+
+def stage_db(db_path: Path) -> Path:
+    """
+    新一代库的构建文件，内容从当前库复制而来（文本字典等编号保持稳定）。
+    用 SQLite 的 backup 复制，当前库正被读写时也能得到一致的快照。
+    """
+    staged = db_path.with_name(f"{db_path.stem}.building-{os.getpid()}{db_path.suffix}")
+    if staged.exists():
+        staged.unlink()
+    if db_path.exists():
+        src = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        dst = sqlite3.connect(str(staged))
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+    return staged
+
+
+def publish_db(staged: Path, db_path: Path, keep: int = KEEP_GENERATIONS) -> None:
+    """原子替换 db_path；已打开旧库的连接继续读旧文件，新打开的连接读到新库。"""
+    if db_path.exists() and keep > 0:
+        gens = db_generations_dir(db_path)
+        gens.mkdir(exist_ok=True)
+        os.link(db_path, gens / f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}{db_path.suffix}")
+    os.replace(staged, db_path)
+    prune_db_generations(db_path, keep)
+
+
+def prune_db_generations(db_path: Path, keep: int = KEEP_GENERATIONS) -> None:
+    gens = db_generations_dir(db_path)
+    if not gens.exists():
+        return
+    for fp in sorted(gens.iterdir(), reverse=True)[keep:]:
+        fp.unlink()
+
+
+def rollback_db(db_path: Path, keep: int = KEEP_GENERATIONS) -> Path:
+    """用最近保留的一代替换当前库；当前库作为最新的一代保留，再次回滚即回到原来的库。"""
+    gens = db_generations_dir(db_path)
+    saved = sorted(gens.iterdir(), reverse=True) if gens.exists() else []
+    if not saved:
+        raise ValueError(f"没有可回滚的库: {gens}")
+    publish_db(saved[0], db_path, keep)
+    return saved[0]
@@ -0,0 +1,171 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .parser import find_skills
+from .build import process_skill
+from .dbkit.base import get_history_session
+from .dbkit.models import Patch, SeriesVersion, PatchSeries
+
+_DATE_RE = re.compile(r"(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})")
+
+
+def patch_date(name: str) -> str:
+    m = _DATE_RE.search(name)
+    return "-".join(m.groups()) if m else name
+
+
+def content_digest(units: str, values: List[float]) -> str:
+    return hashlib.sha1(json.dumps([units, values], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def parse_patch(fp: Path, jump_threshold: float) -> Dict[str, Any]:
+    """在工作进程中解析一份导出文本，只返回写库需要的扁平数据。"""
+    raw = fp.read_bytes()
+    text = raw.decode("utf-8")
+    rows: List[Dict[str, Any]] = []
+    for name, sid, start, end in find_skills(text):
+        r = process_skill(name, sid, start, end, text[start:end], jump_threshold)
+        for x in r.series:
+            values = x.values.tolist()
+            rows.append({
+                "series_id": x.series_id,
+                "skill_id": sid,
+                "skill_name": name,
+                "label": x.label,
+                "units": x.units,
+                "values": values,
+                "analysis": x.analysis.to_json(),
+                "digest": content_digest(x.units, values),
+            })
+    return {"patch": fp.stem, "released": patch_date(fp.stem), "source": fp.name, "digest": hashlib.sha1(raw).hexdigest(), "series": rows}
+
+
+def write_patch(session: Session, parsed: Dict[str, Any], known: Set[str]) -> int:
+    patch = session.execute(select(Patch).where(Patch.patch == parsed["patch"])).scalar_one_or_none()
+    if patch is None:
+        patch = Patch(patch=parsed["patch"], released=parsed["released"], source=parsed["source"], digest=parsed["digest"])
+        session.add(patch)
+        session.flush()
+    else:
+        # 同名版本内容变化：重写映射行，内容表只增不删
+        session.query(PatchSeries).filter(PatchSeries.patch_id == patch.id).delete(synchronize_session=False)
+        patch.released = parsed["released"]
+        patch.source = parsed["source"]
+        patch.digest = parsed["digest"]
+    added = 0
+    seen: Set[str] = set()
+    for r in parsed["series"]:
+        if r["series_id"] in seen:
+            continue
+        seen.add(r["series_id"])
+        if r["digest"] not in known:
+            known.add(r["digest"])
+            vals = r["values"]
+            session.add(SeriesVersion(
+                digest=r["digest"],
+                units=r["units"],
+                values_json=json.dumps(vals),
+                count=len(vals),
+                min=min(vals) if vals else None,
+                max=max(vals) if vals else None,
+                analysis=json.dumps(r["analysis"]),
+            ))
+            added += 1
+        session.add(PatchSeries(
+            patch_id=patch.id,
+            released=parsed["released"],
+            series_id=r["series_id"],
+            skill_id=r["skill_id"],
+            skill_name=r["skill_name"],
+            label=r["label"],
+            digest=r["digest"],
+        ))
+    return added
+
+
+def ingest_dir(dump_dir: Path, db_path: Path, jump_threshold: float, pattern: str = "*.txt", workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    导入目录中的所有版本导出。解析在进程池中并行进行，写库在主进程中按版本日期顺序串行提交
+    （SQLite 只有一个写者）。已导入且内容未变的版本直接跳过。
+    """
+    files = sorted(dump_dir.glob(pattern), key=lambda fp: (patch_date(fp.stem), fp.stem))
+    session = get_history_session(db_path)
+    stats = {"files": len(files), "skipped": 0, "patches": 0, "series": 0, "new_versions": 0}
+    try:
+        ingested = {p: d for p, d in session.execute(select(Patch.patch, Patch.digest))}
+        todo = [fp for fp in files if ingested.get(fp.stem) != hashlib.sha1(fp.read_bytes()).hexdigest()]
+        stats["skipped"] = len(files) - len(todo)
+        known: Set[str] = set(session.execute(select(SeriesVersion.digest)).scalars())
+        workers = min(workers or os.cpu_count() or 1, len(todo)) or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for parsed in pool.map(parse_patch, todo, repeat(jump_threshold)):
+                stats["new_versions"] += write_patch(session, parsed, known)
+                stats["patches"] += 1
+                stats["series"] += len(parsed["series"])
+                session.commit()
+    finally:
+        session.close()
+    return stats
+
+
+def series_history(session: Session, skill: str, label: str, last: int = 20) -> List[Dict[str, Any]]:
+    """
+    某技能某序列在最近 last 个版本中的取值，按版本日期升序返回。
+    skill 为纯数字时按技能编号查（走 series_id 索引），否则按技能名称查。
+    """
+    q = (
+        select(Patch.patch, PatchSeries.released, PatchSeries.series_id, PatchSeries.digest, SeriesVersion.units, SeriesVersion.values_json)
+        .join(Patch, Patch.id == PatchSeries.patch_id)
+        .join(SeriesVersion, SeriesVersion.digest == PatchSeries.digest)
+    )
+    if skill.isdigit():
+        q = q.where(PatchSeries.series_id == f"{skill}:{label}")
+    else:
+        q = q.where(PatchSeries.skill_name == skill, PatchSeries.label == label)
+    q = q.order_by(PatchSeries.released.desc(), Patch.patch.desc()).limit(last)
+    out: List[Dict[str, Any]] = []
+    prev = None
+    for patch, released, series_id, digest, units, values_json in reversed(session.execute(q).all()):
+        out.append({"patch": patch, "released": released, "series_id": series_id, "units": units, "values": json.loads(values_json), "changed": prev is not None and digest != prev})
+        prev = digest
+    return out
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="多版本历史库：导入带日期的导出目录，查询序列在各版本间的变化")
+    p.add_argument("--db-path", default="skill_history.db")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    pi = sub.add_parser("ingest")
+    pi.add_argument("dump_dir")
+    pi.add_argument("--pattern", default="*.txt")
+    pi.add_argument("--workers", type=int, default=None)
+    pi.add_argument("--jump-threshold", type=float, default=2.0)
+    pq = sub.add_parser("query")
+    pq.add_argument("skill", help="技能名称或编号")
+    pq.add_argument("label", help="序列标签，如 外功伤害")
+    pq.add_argument("--last", type=int, default=20)
+    args = p.parse_args()
+    if args.cmd == "ingest":
+        print(ingest_dir(Path(args.dump_dir), Path(args.db_path), args.jump_threshold, args.pattern, args.workers))
+        return
+    session = get_history_session(Path(args.db_path))
+    try:
+        for r in series_history(session, args.skill, args.label, args.last):
+            mark = "*" if r["changed"] else " "
+            print(f"{mark} {r['released']} {r['patch']}: {r['values']}")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import io
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .models import Series
+from .generations import GenerationStore, CURRENT_NAME
+
+MATRIX_NAME = "values.npy"
+LENGTHS_NAME = "lengths.npy"
+INDEX_NAME = "series_index.json"
+
+
+def _numpy():
+    # numpy 导入约 40 ms，只在真正写/读矩阵时才导入
+    try:
+        import numpy
+    except ImportError:  # 可选依赖：pip install skill-growth-report[analytics]
+        return None
+    return numpy
+
+
+def _write_bytes(fp: Path, data: bytes, cache: Optional[Dict[Path, Any]]) -> bool:
+    if cache is not None and cache.get(fp) == data:
+        return False
+    tmp = fp.with_name(fp.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, fp)
+    if cache is not None:
+        cache[fp] = data
+    return True
+
+
+def _npy_bytes(np, arr) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, arr, allow_pickle=False)
+    return buf.getvalue()
+
+
+def write_matrix(data_dir: Path, series: List[Series], cache: Optional[Dict[Path, Any]] = None) -> bool:
+    """
+    把全部序列写成 series × max_levels 的 float64 矩阵（不足处为 NaN）、长度向量和 id 索引。
+    行按技能首次出现的顺序分组，同一技能的序列连续存放，按技能取数时可以直接切片。
+    未安装 numpy 时跳过。
+    """
+    np = _numpy()
+    if np is None:
+        return False
+    order: Dict[str, List[Series]] = {}
+    for x in series:
+        order.setdefault(x.skill_id, []).append(x)
+    rows = [x for group in order.values() for x in group]
+    width = max((len(x.values) for x in rows), default=0)
+    mat = np.full((len(rows), width), np.nan, dtype=np.float64)
+    lengths = np.zeros(len(rows), dtype=np.int32)
+    skills: Dict[str, Tuple[int, int]] = {}
+    for i, x in enumerate(rows):
+        mat[i, :len(x.values)] = x.values
+        lengths[i] = len(x.values)
+        start, _ = skills.get(x.skill_id, (i, i))
+        skills[x.skill_id] = (start, i + 1)
+    index = {"series_ids": [x.series_id for x in rows], "skills": skills}
+    _write_bytes(data_dir / MATRIX_NAME, _npy_bytes(np, mat), cache)
+    _write_bytes(data_dir / LENGTHS_NAME, _npy_bytes(np, lengths), cache)
+    _write_bytes(data_dir / INDEX_NAME, json.dumps(index, ensure_ascii=False).encode("utf-8"), cache)
+    return True
+
+
+class SeriesMatrix:
+    """
+    只读加载 write_matrix 的输出。矩阵以 mmap 方式打开，不读入内存，多个进程共享同一份页缓存；
+    按序列或技能取出的都是矩阵上的视图，不复制数据。
+
+        m = SeriesMatrix(Path("docs/data"))  # 有 current.json 时读当前代
+        m.series("30604:外功伤害")      # 一维，长度为实际级数
+        m.skill("30604")                # 二维，该技能的全部序列（NaN 填充）
+    """
+
+    def __init__(self, data_dir: Path):
+        np = _numpy()
+        if np is None:
+            raise ImportError("SeriesMatrix 需要 numpy")
+        if (data_dir / CURRENT_NAME).exists():
+            data_dir = GenerationStore(data_dir).current_dir()
+        self.values = np.load(data_dir / MATRIX_NAME, mmap_mode="r")
+        self.lengths = np.load(data_dir / LENGTHS_NAME, mmap_mode="r")
+        index = json.loads((data_dir / INDEX_NAME).read_text(encoding="utf-8"))
+        self.series_ids: List[str] = index["series_ids"]
+        self.row_of: Dict[str, int] = {sid: i for i, sid in enumerate(self.series_ids)}
+        self.skill_rows: Dict[str, Tuple[int, int]] = {k: (a, b) for k, (a, b) in index["skills"].items()}
+
+    def __len__(self) -> int:
+        return len(self.series_ids)
+
+    def series(self, series_id: str):
+        i = self.row_of[series_id]
+        return self.values[i, :int(self.lengths[i])]
+
+    def skill(self, skill_id: str):
+        start, stop = self.skill_rows[skill_id]
+        return self.values[start:stop]
+
+    def skill_series_ids(self, skill_id: str) -> List[str]:
+        start, stop = self.skill_rows[skill_id]
+        return self.series_ids[start:stop]
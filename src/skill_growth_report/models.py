@@ -1,36 +1,23 @@
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from array import array
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Iterator
 
-
-@dataclass
-class Skill:
-    skill_id: str
-    name: str
-    source_span: tuple[int, int]
+# 流水线内部使用的记录类型：parser -> analyzer -> DB 写入 -> 导出 全程传递这些对象，
+# 只在写 JSON / 写库时才转换成 dict。用 slots 去掉每个实例的 __dict__，
+# 数值序列用 array('d') 连续存放，不再为每一级单独建 float 对象和 dict。
 
 
-@dataclass
-class Series:
-    series_id: str
-    skill_id: str
+@dataclass(slots=True)
+class Sequence:
     label: str
     units: str
-    meta: Dict[str, Any]
+    values: array
+    action: str
+    resource: str
 
 
-@dataclass
-class ValuePoint:
-    id: Optional[int]
-    series_id: str
-    level_index: int
-    value: float
-    diff_to_prev: Optional[float]
-    is_jump: bool
-
-
-@dataclass
+@dataclass(slots=True)
 class Analysis:
-    series_id: str
     is_linear: bool
     trend: str
     min: Optional[float]
@@ -38,3 +25,55 @@ class Analysis:
     count: int
     jump_points: List[int]
 
+    def to_json(self) -> Dict[str, Any]:
+        return {"is_linear": self.is_linear, "trend": self.trend, "min": self.min, "max": self.max, "count": self.count, "jump_points": self.jump_points}
+
+
+@dataclass(slots=True)
+class Series:
+    series_id: str
+    skill_id: str
+    label: str
+    units: str
+    values: array
+    analysis: Analysis
+    # 动作 + 资源的序列族（charts.sequence_family），聚合与图表按它分组
+    family: str = ""
+
+    def diffs(self) -> List[float]:
+        v = self.values
+        return [v[i] - v[i - 1] for i in range(1, len(v))]
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """逐级产出 (level_index, value, diff_to_prev, is_jump)。"""
+        jumps = set(self.analysis.jump_points)
+        prev = None
+        for idx, v in enumerate(self.values, start=1):
+            yield idx, v, (None if prev is None else v - prev), idx in jumps
+            prev = v
+
+    def rows_json(self) -> List[Dict[str, Any]]:
+        return [{"level_index": i, "value": v, "diff_to_prev": d, "is_jump": j} for i, v, d, j in self.iter_rows()]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"series_id": self.series_id, "skill_id": self.skill_id, "label": self.label, "units": self.units, "meta": {}}
+
+
+@dataclass(slots=True)
+class Skill:
+    skill_id: str
+    name: str
+    start: int
+    end: int
+    meta: Dict[str, Any]
+    description_ids: List[int]
+    effect_ids: List[int]
+    full_text: str
+    groups: Dict[str, Dict[str, List[Sequence]]]
+    series: List[Series] = field(default_factory=list)
+
+    def groups_json(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        return {g: {k: [{"label": s.label, "values": s.values.tolist()} for s in items] for k, items in bucket.items()} for g, bucket in self.groups.items()}
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"skill_id": self.skill_id, "name": self.name, "meta": self.meta, "description_ids": self.description_ids, "effect_ids": self.effect_ids, "full_text": self.full_text, "groups": self.groups_json()}
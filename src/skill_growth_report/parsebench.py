@@ -0,0 +1,281 @@
+import hashlib
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .parser import find_skills, extract_sequences, extract_description, extract_special_effects
+from .build import read_text, process_skill, unique_label
+from .export import ExportCollector
+from .charts import build_chart_aggregates
+from .textdict import TextDictionary
+
+# 解析器的正确性与吞吐基准：
+# 1. 按构建的方式解析输入，导出结果与入库的黄金快照（parsebench_golden.json）逐项比对。
+#    快照是冻结的：构建不会改写它，只有确认解析结果的变化符合预期后才用 --record 重新记录；
+# 2. 把输入复制放大、打乱技能块顺序、在块末尾追加截断/畸形的行等变换成大语料，
+#    每个技能块的解析结果必须与原文中对应块一致；
+# 3. 分别统计 find_skills / extract_sequences / extract_description / extract_special_effects / unique_label
+#    在各语料上的 块/秒 与 MB/秒。
+# 改写解析器（换正则、加速）前后各跑一次，结果不一致或变慢都能直接看出来。
+
+GOLDEN_FILES = ["texts", "skills", "summary", "series", "values", "analysis", "charts"]
+GOLDEN_FP = "parsebench_golden.json"
+MAX_REPORTED = 5
+
+Blocks = List[Tuple[str, str, int, int]]
+
+
+def _plain(data: Any) -> Any:
+    # 与导出文件同样经过一次 JSON 序列化，比较时不受 tuple/list 等类型差异影响
+    return json.loads(json.dumps(data, ensure_ascii=False))
+
+
+def _first_diffs(name: str, got: Any, want: Any) -> List[str]:
+    if got == want:
+        return []
+    if isinstance(got, list) and isinstance(want, list):
+        out = [f"{name}[{i}]" for i, (a, b) in enumerate(zip(got, want)) if a != b][:MAX_REPORTED]
+        if len(got) != len(want):
+            out.append(f"{name}: {len(got)} 项，快照 {len(want)} 项")
+        return out
+    if isinstance(got, dict) and isinstance(want, dict):
+        keys = [k for k in sorted(set(got) | set(want)) if got.get(k) != want.get(k)]
+        return [f"{name}[{k!r}]" for k in keys[:MAX_REPORTED]]
+    return [name]
+
+
+def _digest(data: Any) -> str:
+    return hashlib.sha1(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _fingerprint(data: Any) -> Any:
+    """快照只存每个列表项/字典键的摘要：文件小，差异仍能定位到具体的项。"""
+    if isinstance(data, list):
+        return [_digest(x) for x in data]
+    if isinstance(data, dict):
+        return {k: _digest(v) for k, v in data.items()}
+    return _digest(data)
+
+
+def _export(text: str, jump_threshold: float) -> Tuple[Dict[str, Any], TextDictionary, List[Any]]:
+    # 每次都从空字典开始编号，结果只取决于输入与解析器，与哪个库、构建过几次无关
+    texts = TextDictionary()
+    skills = [process_skill(name, sid, start, end, text[start:end], jump_threshold, texts) for name, sid, start, end in find_skills(text)]
+    collector = ExportCollector()
+    collector.add(skills)
+    got = {
+        "texts": texts.texts,
+        "skills": collector.skills_json,
+        "summary": collector.summary,
+        "series": collector.series_json,
+        "values": collector.values_json,
+        "analysis": collector.analysis_json,
+        "charts": build_chart_aggregates(skills),
+    }
+    return {name: _plain(got[name]) for name in GOLDEN_FILES}, texts, skills
+
+
+def record_golden(text: str, golden_fp: Path, jump_threshold: float) -> None:
+    """重新记录黄金快照。只在确认解析结果的变化符合预期后使用。"""
+    got, _, _ = _export(text, jump_threshold)
+    snapshot = {
+        "input_sha1": hashlib.sha1(text.encode("utf-8")).hexdigest(),
+        "jump_threshold": jump_threshold,
+        "files": {name: _fingerprint(got[name]) for name in GOLDEN_FILES},
+    }
+    golden_fp.write_text(json.dumps(snapshot, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+
+
+def check_golden(text: str, golden_fp: Path, jump_threshold: float) -> Tuple[List[str], TextDictionary, List[Dict[str, Any]]]:
+    """
+    解析 text 并与冻结的黄金快照 golden_fp 比对。
+    返回 (差异列表, 文本字典, 每个技能块的结果签名)；签名供变换语料比对用。
+    """
+    golden = json.loads(golden_fp.read_text(encoding="utf-8"))
+    got, texts, skills = _export(text, jump_threshold)
+    diffs: List[str] = []
+    if golden["input_sha1"] != hashlib.sha1(text.encode("utf-8")).hexdigest():
+        diffs.append(f"输入与记录快照时的不同（{golden_fp}）")
+    if golden["jump_threshold"] != jump_threshold:
+        diffs.append(f"jump_threshold={jump_threshold}，快照记录时为 {golden['jump_threshold']}")
+    for name in GOLDEN_FILES:
+        diffs.extend(_first_diffs(f"{name}.json", _fingerprint(got[name]), golden["files"][name]))
+    return diffs, texts, [_signature(s) for s in skills]
+
+
+def _signature(skill) -> Dict[str, Any]:
+    return _plain({
+        "skill": skill.to_json(),
+        "series": [[x.to_json(), x.rows_json(), x.analysis.to_json()] for x in skill.series],
+    })
+
+
+def _series_part(sig: Dict[str, Any]) -> Dict[str, Any]:
+    # 追加残行的变换会合理地改变描述与特殊效果，只比较切分和数值序列
+    return {"skill_id": sig["skill"]["skill_id"], "name": sig["skill"]["name"], "series": sig["series"]}
+
+
+def _segments(text: str, blocks: Blocks) -> Tuple[str, List[str]]:
+    """把原文切成 (前言, 每个技能的“标题行 + 正文”片段)，片段统一以换行开头，可任意重排拼接。"""
+    first = text.rfind("\n", 0, blocks[0][2]) if blocks else len(text)
+    first = max(first, 0)
+    segs: List[str] = []
+    for i, (_, _, _, end) in enumerate(blocks):
+        seg = text[first if i == 0 else blocks[i - 1][3]:end]
+        segs.append(seg if seg.startswith("\n") else "\n" + seg)
+    return text[:first], segs
+
+
+def mutate_repeat(text: str, blocks: Blocks, scale: int, seed: int) -> Tuple[str, List[int]]:
+    """原文复制 scale 份首尾相接；第 j 个块应与原文第 j % n 个块结果相同。"""
+    preamble, segs = _segments(text, blocks)
+    order = [i for _ in range(scale) for i in range(len(segs))]
+    return preamble + "".join(segs[i] for i in order), order
+
+
+def mutate_shuffle(text: str, blocks: Blocks, scale: int, seed: int) -> Tuple[str, List[int]]:
+    """复制 scale 份后按 seed 打乱技能块顺序：每个块的解析不应依赖前后是哪个技能。"""
+    preamble, segs = _segments(text, blocks)
+    order = [i for _ in range(scale) for i in range(len(segs))]
+    random.Random(seed).shuffle(order)
+    return preamble + "".join(segs[i] for i in order), order
+
+
+_GROUP_RE = re.compile(r"<[^<>\n]*>")
+
+
+def _truncated_line(seg: str, rng: random.Random) -> Optional[str]:
+    """从片段里随机取一行含数值组的行，截断在该行第一个 <…> 数值组内部（模拟导出中途被截断）。"""
+    lines = [l for l in seg.split("\n") if _GROUP_RE.search(l)]
+    if not lines:
+        return None
+    line = rng.choice(lines)
+    m = _GROUP_RE.search(line)
+    return line[:m.start() + 1 + rng.randrange(max(m.end() - m.start() - 2, 1))]
+
+
+def mutate_truncate(text: str, blocks: Blocks, scale: int, seed: int) -> Tuple[str, List[int]]:
+    """
+    复制 scale 份，每个块末尾追加一行截断的数值行：未闭合的 <…> 不应产生序列，
+    也不应吞掉下一个技能块。
+    """
+    preamble, segs = _segments(text, blocks)
+    rng = random.Random(seed)
+    order = [i for _ in range(scale) for i in range(len(segs))]
+    out: List[str] = []
+    for i in order:
+        cut = _truncated_line(segs[i], rng)
+        out.append(segs[i] if cut is None else f"{segs[i]}\n{cut}")
+    return preamble + "".join(out), order
+
+
+def mutate_malformed(text: str, blocks: Blocks, scale: int, seed: int) -> Tuple[str, List[int]]:
+    """
+    复制 scale 份，每个块末尾追加畸形行：编号位数不对或缺编号的“标题行”不应切出新块，
+    数值组里没有数字的行不应产生序列。
+    """
+    preamble, segs = _segments(text, blocks)
+    rng = random.Random(seed)
+    order = [i for _ in range(scale) for i in range(len(segs))]
+    out: List[str] = []
+    for i in order:
+        name, sid = blocks[i][0], blocks[i][1]
+        junk = [
+            f"{name} - {sid[:4]}",
+            f"{name} - {sid}{rng.randrange(10)}",
+            f"{name} -",
+            "消耗< / / >点精神。",
+            f"造成<{name} / ->点外功伤害。",
+        ]
+        rng.shuffle(junk)
+        out.append(segs[i] + "".join(f"\n{line}" for line in junk))
+    return preamble + "".join(out), order
+
+
+MUTATIONS: Dict[str, Callable[[str, Blocks, int, int], Tuple[str, List[int]]]] = {
+    "repeat": mutate_repeat,
+    "shuffle": mutate_shuffle,
+    "truncate": mutate_truncate,
+    "malformed": mutate_malformed,
+}
+# 这些变换往块里加了行，描述与特殊效果会跟着变，只要求切分与数值序列不变
+SERIES_ONLY = {"truncate", "malformed"}
+
+
+def check_mutation(text: str, expected: List[int], baseline: List[Dict[str, Any]], texts: TextDictionary, jump_threshold: float, series_only: bool = False) -> List[str]:
+    blocks = find_skills(text)
+    if len(blocks) != len(expected):
+        return [f"切分出 {len(blocks)} 个技能块，应为 {len(expected)} 个"]
+    diffs: List[str] = []
+    for (name, sid, start, end), i in zip(blocks, expected):
+        got, want = _signature(process_skill(name, sid, start, end, text[start:end], jump_threshold, texts)), baseline[i]
+        if series_only:
+            got, want = _series_part(got), _series_part(want)
+        if got != want:
+            diffs.append(f"{sid} {name}（第 {start} 字符起）")
+            if len(diffs) >= MAX_REPORTED:
+                break
+    return diffs
+
+
+def _unique_labels(seqs) -> None:
+    store: Dict[str, Any] = {}
+    for s in seqs:
+        store[unique_label(store, s.label)] = s.values
+
+
+def measure(text: str, rounds: int) -> Dict[str, Dict[str, float]]:
+    """各提取函数在整份语料上的最短耗时（rounds 次取最小）及折算的 块/秒、MB/秒。"""
+    blocks = [text[start:end] for _, _, start, end in find_skills(text)]
+    seqs = [extract_sequences(b) for b in blocks]
+    text_mb = len(text.encode("utf-8")) / 1e6
+    blocks_mb = sum(len(b.encode("utf-8")) for b in blocks) / 1e6
+    cases: List[Tuple[str, Callable[[], Any], float]] = [
+        ("find_skills", lambda: find_skills(text), text_mb),
+        ("extract_sequences", lambda: [extract_sequences(b) for b in blocks], blocks_mb),
+        ("extract_description", lambda: [extract_description(b) for b in blocks], blocks_mb),
+        ("extract_special_effects", lambda: [extract_special_effects(b) for b in blocks], blocks_mb),
+        # unique_label 的输入是每块已提取出的序列标签，MB/秒 仍按块正文折算，便于与其他函数横向比较
+        ("unique_label", lambda: [_unique_labels(s) for s in seqs], blocks_mb),
+    ]
+    out: Dict[str, Dict[str, float]] = {}
+    for name, fn, mb in cases:
+        best = float("inf")
+        for _ in range(rounds):
+            t = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t)
+        best = max(best, 1e-9)
+        out[name] = {"seconds": best, "blocks_per_sec": len(blocks) / best, "mb_per_sec": mb / best}
+    return out
+
+
+def run(input_fp: Path, golden_fp: Path, jump_threshold: float, scale: int = 20, seed: int = 0, rounds: int = 3, mutations: Optional[List[str]] = None) -> Dict[str, Any]:
+    text = read_text(input_fp)
+    blocks = find_skills(text)
+    diffs, texts, baseline = check_golden(text, golden_fp, jump_threshold)
+    report: Dict[str, Any] = {"corpora": {}}
+    report["corpora"][input_fp.name] = {"blocks": len(blocks), "mb": len(text.encode("utf-8")) / 1e6, "diffs": diffs, "throughput": measure(text, rounds)}
+    for name in mutations or list(MUTATIONS):
+        mutated, expected = MUTATIONS[name](text, blocks, scale, seed)
+        report["corpora"][f"{name}x{scale}"] = {
+            "blocks": len(expected),
+            "mb": len(mutated.encode("utf-8")) / 1e6,
+            "diffs": check_mutation(mutated, expected, baseline, texts, jump_threshold, name in SERIES_ONLY),
+            "throughput": measure(mutated, rounds),
+        }
+    report["ok"] = not any(c["diffs"] for c in report["corpora"].values())
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for corpus, c in report["corpora"].items():
+        status = "OK" if not c["diffs"] else f"{len(c['diffs'])} 处不一致"
+        print(f"{corpus}: {c['blocks']} 块, {c['mb']:.2f} MB, {status}")
+        for d in c["diffs"]:
+            print(f"  ! {d}")
+        for fn, t in c["throughput"].items():
+            print(f"  {fn:<24} {t['seconds'] * 1000:9.2f} ms {t['blocks_per_sec']:12.0f} 块/秒 {t['mb_per_sec']:9.2f} MB/秒")
@@ -1,5 +1,8 @@
 import re
-from typing import List, Dict, Any, Tuple
+from array import array
+from typing import List, Tuple
+
+from .models import Sequence
 
 
 def find_skills(text: str) -> List[Tuple[str, str, int, int]]:
@@ -85,8 +88,8 @@ def extract_description(block: str) -> str:
     return "\n".join(sanitized)
 
 
-def extract_sequences(block: str) -> List[Dict[str, Any]]:
-    res: List[Dict[str, Any]] = []
+def extract_sequences(block: str) -> List[Sequence]:
+    res: List[Sequence] = []
     for m in re.finditer(r"<([^>]+)>\s*点([\u4e00-\u9fa5a-zA-Z0-9_]+?)(?=(使|对|回复|恢复|造成|并|，|。|、|;|；|:|：|（|）|\(|\)|\s))", block):
         seq = _parse_numbers(m.group(1))
         label = _normalize_label(m.group(2))
@@ -94,14 +97,14 @@ def extract_sequences(block: str) -> List[Dict[str, Any]]:
         action = _detect_action(pre)
         norm_res, _ = _match_resource(label)
         if seq:
-            res.append({"label": label, "units": "点", "values": seq, "action": action, "resource": norm_res})
+            res.append(Sequence(label, "点", array("d", seq), action, norm_res))
     for m in re.finditer(r"<([^>]+)>\s*([\u4e00-\u9fa5a-zA-Z0-9_]+伤害)", block):
         seq = _parse_numbers(m.group(1))
         label = _normalize_label(m.group(2))
         action = "造成"
         norm_res = label
         if seq:
-            res.append({"label": label, "units": "点", "values": seq, "action": action, "resource": norm_res})
+            res.append(Sequence(label, "点", array("d", seq), action, norm_res))
     return res
 
 
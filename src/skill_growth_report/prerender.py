@@ -0,0 +1,144 @@
+import re
+from html import escape
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence
+
+from .models import Skill, Series
+from .textdict import TextDictionary
+
+# 构建时预渲染的静态页面：不需要任何 JS 就能浏览
+# - skills/<技能编号>.html：单个技能的描述、特殊效果、每条序列的内联 SVG 折线和数值表
+# - skills/index.html：全部技能的静态列表
+# - index.html 中 <!-- prerender:listing --> 与 <!-- /prerender:listing --> 之间的内容替换为同一份列表，
+#   交互应用加载完数据后再移除它
+
+SKILL_PAGE_DIR = "skills"
+LISTING_START = "<!-- prerender:listing -->"
+LISTING_END = "<!-- /prerender:listing -->"
+_LISTING_RE = re.compile(re.escape(LISTING_START) + r".*?" + re.escape(LISTING_END), re.S)
+
+_JUMP_TAG = '<span class="jump">跃迁</span>'
+
+SPARK_WIDTH = 160
+SPARK_HEIGHT = 32
+
+_PAGE_STYLE = (
+    "body{margin:0;font-family:-apple-system,BlinkMacSystemFont,Segoe UI,Microsoft YaHei,Helvetica,Arial,sans-serif;color:#222;background:#f0f2f5}"
+    "header{background:#001529;color:#fff;padding:14px 24px;font-size:18px;font-weight:bold}header a{color:#fff;text-decoration:none}"
+    "main{background:#fff;margin:24px;padding:24px}"
+    "table{border-collapse:collapse;width:100%;font-size:13px}th,td{border:1px solid #eee;padding:6px 8px;text-align:left;vertical-align:top}"
+    "thead{background:#fafafa}.muted{color:#888;font-size:12px}.tag{display:inline-block;border:1px solid #d3adf7;color:#531dab;background:#f9f0ff;font-size:12px;padding:0 6px;margin-left:6px}"
+    ".jump{color:#cf1322}.series{margin:16px 0}svg{vertical-align:middle}"
+)
+
+
+def _fmt(v: Optional[float]) -> str:
+    if v is None:
+        return "-"
+    return f"{v:.15g}"
+
+
+def sparkline_svg(values: Sequence[float], jump_points: Sequence[int] = (), width: int = SPARK_WIDTH, height: int = SPARK_HEIGHT, color: str = "#1677ff") -> str:
+    """数值序列的内联 SVG 折线，跃迁点（级次从 1 开始）画成红点。"""
+    if not values:
+        return ""
+    pad = 3
+    lo, hi = min(values), max(values)
+    span = (hi - lo) or 1.0
+    step = (width - 2 * pad) / max(len(values) - 1, 1)
+    pts = [(pad + i * step, height - pad - (v - lo) / span * (height - 2 * pad)) for i, v in enumerate(values)]
+    poly = " ".join(f"{x:.1f},{y:.1f}" for x, y in pts)
+    dots = "".join(f'<circle cx="{pts[j - 1][0]:.1f}" cy="{pts[j - 1][1]:.1f}" r="2.5" fill="#cf1322"/>' for j in jump_points if 1 <= j <= len(pts))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" role="img">'
+        f'<polyline fill="none" stroke="{color}" stroke-width="1.5" points="{poly}"/>{dots}</svg>'
+    )
+
+
+def _series_block(x: Series) -> str:
+    a = x.analysis
+    color = "#2e7d32" if a.is_linear else "#1677ff"
+    rows = "".join(
+        f"<tr><td>{i}</td><td>{_fmt(v)}</td><td>{_fmt(d)}</td><td>{_JUMP_TAG if j else ''}</td></tr>"
+        for i, v, d, j in x.iter_rows()
+    )
+    return (
+        f'<div class="series"><h3>{escape(x.label)} {sparkline_svg(x.values, a.jump_points, color=color)}'
+        f' <span class="muted">{escape(a.trend)}{"，线性" if a.is_linear else ""}，{_fmt(a.min)} ~ {_fmt(a.max)}</span></h3>'
+        f"<table><thead><tr><th>级次</th><th>数值</th><th>差值</th><th>跃迁</th></tr></thead><tbody>{rows}</tbody></table></div>"
+    )
+
+
+def _tags(meta: Dict[str, Any]) -> str:
+    tags = []
+    if meta.get("has_threefold"):
+        tags.append("三重效果")
+    if meta.get("steal_spirit"):
+        tags.append("偷取精神")
+    return "".join(f'<span class="tag">{t}</span>' for t in tags)
+
+
+def _page(title: str, body: str, home: str) -> str:
+    return (
+        '<!doctype html>\n<html lang="zh-CN">\n<head>\n<meta charset="utf-8" />\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1" />\n'
+        f"<title>{escape(title)}</title>\n<style>{_PAGE_STYLE}</style>\n</head>\n<body>\n"
+        f'<header><a href="{home}">技能数据报告</a></header>\n<main>\n{body}\n</main>\n</body>\n</html>\n'
+    )
+
+
+def render_skill_page(skill: Skill, texts: TextDictionary) -> str:
+    desc = "".join(f"<p>{escape(texts.texts[i])}</p>" for i in skill.description_ids)
+    effects = "".join(f"<li>{escape(texts.texts[i])}</li>" for i in skill.effect_ids)
+    body = (
+        f'<h1>{escape(skill.name)} <span class="muted">({escape(skill.skill_id)})</span>{_tags(skill.meta)}</h1>\n'
+        f'<p><a href="../index.html?q={escape(skill.skill_id)}">在交互页中查看</a> · <a href="index.html">全部技能</a></p>\n'
+        f"<h2>技能描述</h2>\n{desc or '<p>-</p>'}\n"
+        f"<h2>特殊效果</h2>\n{f'<ul>{effects}</ul>' if effects else '<p>-</p>'}\n"
+        f"<h2>数值序列</h2>\n{''.join(_series_block(x) for x in skill.series) or '<p>-</p>'}"
+    )
+    return _page(f"{skill.name}（{skill.skill_id}）- 技能数据报告", body, "../index.html")
+
+
+def _range(lo: Optional[float], hi: Optional[float]) -> str:
+    return f"{_fmt(lo)} - {_fmt(hi)}" if lo is not None and hi is not None else "-"
+
+
+def render_listing(summary: List[Dict[str, Any]], texts: TextDictionary, link_prefix: str) -> str:
+    rows = []
+    for r in summary:
+        desc = "<br>".join(escape(texts.texts[i]) for i in r["description_ids"])
+        effects = "；".join(escape(texts.texts[i]) for i in r["effect_ids"]) or "-"
+        rows.append(
+            f'<tr><td><a href="{link_prefix}{escape(r["sid"])}.html">{escape(r["name"])}</a> <span class="muted">({escape(r["sid"])})</span>{_tags(r["meta"])}</td>'
+            f"<td>{desc}</td><td>{effects}</td><td>{_range(r['consume_min'], r['consume_max'])}</td><td>{_range(r['deal_min'], r['deal_max'])}</td></tr>"
+        )
+    return (
+        "<table><thead><tr><th>技能</th><th>技能描述</th><th>特殊效果</th><th>消耗区间</th><th>造成区间</th></tr></thead>"
+        f"<tbody>{''.join(rows)}</tbody></table>"
+    )
+
+
+def prerender_site(site_dir: Path, skills: List[Skill], summary: List[Dict[str, Any]], texts: TextDictionary, write) -> List[Path]:
+    """
+    write(fp, text) 由调用方提供（导出时复用 write-if-changed 缓存）。
+    输入中已不存在的技能的页面会被删除，返回删除的路径，调用方据此清理缓存。
+    """
+    page_dir = site_dir / SKILL_PAGE_DIR
+    page_dir.mkdir(parents=True, exist_ok=True)
+    pages = set()
+    for s in skills:
+        fp = page_dir / f"{s.skill_id}.html"
+        write(fp, render_skill_page(s, texts))
+        pages.add(fp.name)
+    removed = [fp for fp in page_dir.glob("*.html") if fp.name != "index.html" and fp.name not in pages]
+    for fp in removed:
+        fp.unlink()
+    write(page_dir / "index.html", _page("全部技能 - 技能数据报告", f"<h1>全部技能（{len(summary)}）</h1>\n{render_listing(summary, texts, '')}", "../index.html"))
+    index_fp = site_dir / "index.html"
+    if index_fp.exists():
+        html = index_fp.read_text(encoding="utf-8")
+        if LISTING_START in html:
+            listing = f"{LISTING_START}\n{render_listing(summary, texts, SKILL_PAGE_DIR + '/')}\n{LISTING_END}"
+            write(index_fp, _LISTING_RE.sub(lambda _: listing, html, count=1))
+    return removed
@@ -0,0 +1,152 @@
+import json
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .models import Sequence, Analysis, Series, Skill
+from .textdict import TextDictionary, text_digest
+
+# 只读访问已构建好的库：直接用标准库 sqlite3，不导入 SQLAlchemy/ORM，
+# 供 export/stats/query 这类不需要写库的子命令使用。
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    if not db_path.exists():
+        raise FileNotFoundError(f"数据库不存在: {db_path}（先运行 build）")
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+def _groups_from_json(groups: Dict[str, Any]) -> Dict[str, Dict[str, List[Sequence]]]:
+    return {g: {k: [Sequence(it["label"], "点", array("d", it["values"]), "", "") for it in items] for k, items in bucket.items()} for g, bucket in groups.items()}
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def load_skills(db_path: Path) -> Tuple[List[Skill], TextDictionary]:
+    """从库中还原 Skill/Series 记录（顺序与构建时写入的顺序一致）及文本字典。"""
+    conn = connect(db_path)
+    try:
+        texts = TextDictionary()
+        if _table_exists(conn, "texts"):
+            texts = TextDictionary(t for (t,) in conn.execute("SELECT text FROM texts ORDER BY text_id"))
+        values: Dict[str, List[float]] = {}
+        for series_id, v in conn.execute("SELECT series_id, value FROM values_tbl ORDER BY series_id, level_index"):
+            values.setdefault(series_id, []).append(v)
+        analyses: Dict[str, Analysis] = {}
+        for series_id, is_linear, trend, min_v, max_v, count, jump_points in conn.execute(
+            "SELECT series_id, is_linear, trend, min, max, count, jump_points FROM analysis"
+        ):
+            analyses[series_id] = Analysis(bool(is_linear), trend, min_v, max_v, count, json.loads(jump_points))
+        series: Dict[str, List[Series]] = {}
+        # family 列之前的旧库没有序列族，读出为空串
+        has_family = any(row[1] == "family" for row in conn.execute("PRAGMA table_info(series)"))
+        cols = "series_id, skill_id, label, units, " + ("family" if has_family else "''")
+        for series_id, skill_id, label, units, family in conn.execute(f"SELECT {cols} FROM series ORDER BY rowid"):
+            series.setdefault(skill_id, []).append(Series(series_id, skill_id, label, units, array("d", values.get(series_id, [])), analyses[series_id], family))
+        skills: List[Skill] = []
+        for skill_id, name, source_span in conn.execute("SELECT skill_id, name, source_span FROM skills ORDER BY rowid"):
+            span = json.loads(source_span)
+            if "description_ids" not in span:
+                # 文本字典之前的旧库：source_span 中直接存的是文本
+                desc = span.get("description", "")
+                span["description_ids"] = texts.intern_all(desc.split("\n")) if desc else []
+                span["effect_ids"] = texts.intern_all(span.get("special_effects", []))
+            skills.append(Skill(
+                skill_id=skill_id,
+                name=name,
+                start=span.get("start", 0),
+                end=span.get("end", 0),
+                meta=span.get("meta", {}),
+                description_ids=span["description_ids"],
+                effect_ids=span["effect_ids"],
+                full_text=span.get("full_text", ""),
+                groups=_groups_from_json(span.get("groups", {})),
+                series=series.get(skill_id, []),
+            ))
+        return skills, texts
+    finally:
+        conn.close()
+
+
+def stats(db_path: Path) -> Dict[str, Any]:
+    conn = connect(db_path)
+    try:
+        one = lambda sql: conn.execute(sql).fetchone()[0]
+        return {
+            "skills": one("SELECT count(*) FROM skills"),
+            "series": one("SELECT count(*) FROM series"),
+            "values": one("SELECT count(*) FROM values_tbl"),
+            "linear_series": one("SELECT count(*) FROM analysis WHERE is_linear = 1"),
+            "series_with_jumps": one("SELECT count(*) FROM analysis WHERE jump_points != '[]'"),
+            "trend": dict(conn.execute("SELECT trend, count(*) FROM analysis GROUP BY trend ORDER BY trend").fetchall()),
+            "max_levels": one("SELECT coalesce(max(count), 0) FROM analysis"),
+        }
+    finally:
+        conn.close()
+
+
+def query_series(db_path: Path, skill: str, label: Optional[str] = None) -> List[Dict[str, Any]]:
+    """按技能编号或名称（子串）查询序列及其数值。"""
+    conn = connect(db_path)
+    try:
+        sql = (
+            "SELECT k.skill_id, k.name, s.series_id, s.label, s.units FROM series s "
+            "JOIN skills k ON k.skill_id = s.skill_id WHERE "
+        )
+        args: List[Any] = []
+        if skill.isdigit():
+            sql += "k.skill_id = ?"
+            args.append(skill)
+        else:
+            sql += "k.name LIKE ?"
+            args.append(f"%{skill}%")
+        if label:
+            sql += " AND s.label = ?"
+            args.append(label)
+        out: List[Dict[str, Any]] = []
+        for skill_id, name, series_id, lab, units in conn.execute(sql + " ORDER BY s.rowid", args).fetchall():
+            vals = [v for (v,) in conn.execute("SELECT value FROM values_tbl WHERE series_id = ? ORDER BY level_index", (series_id,))]
+            out.append({"skill_id": skill_id, "name": name, "series_id": series_id, "label": lab, "units": units, "values": vals})
+        return out
+    finally:
+        conn.close()
+
+
+def family_stats(db_path: Path, family: str, level: Optional[int] = None) -> Dict[str, Any]:
+    """从物化聚合表读取某序列族的统计；指定 level 时只取该级次一行。"""
+    conn = connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute("SELECT * FROM agg_families WHERE family = ?", (family,)).fetchone()
+        if row is None:
+            return {}
+        out = {k: row[k] for k in row.keys() if k != "id"}
+        sql = "SELECT * FROM agg_levels WHERE family = ?"
+        args: List[Any] = [family]
+        if level is not None:
+            sql += " AND level_index = ?"
+            args.append(level)
+        out["levels"] = [{k: r[k] for k in r.keys() if k not in ("id", "family")} for r in conn.execute(sql + " ORDER BY level_index", args)]
+        return out
+    finally:
+        conn.close()
+
+
+def skills_with_text(db_path: Path, text: str) -> List[Dict[str, Any]]:
+    """共用某条描述行/特殊效果的技能：texts.digest 唯一索引 + skill_texts.text_id 索引各查一次。"""
+    conn = connect(db_path)
+    try:
+        return [
+            {"skill_id": skill_id, "name": name, "kind": kind, "position": position}
+            for skill_id, name, kind, position in conn.execute(
+                "SELECT k.skill_id, k.name, r.kind, r.position FROM texts t "
+                "JOIN skill_texts r ON r.text_id = t.text_id JOIN skills k ON k.skill_id = r.skill_id "
+                "WHERE t.digest = ? AND t.text = ? ORDER BY k.rowid",
+                (text_digest(text), text),
+            )
+        ]
+    finally:
+        conn.close()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import re
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """
+    支持单段 Range 请求的静态文件服务，用于本地测试 data/report.sqlite3 的按页加载
+    （python -m http.server 不支持 Range，GitHub Pages 支持）。
+    """
+
+    def send_head(self):
+        m = _RANGE_RE.match(self.headers.get("Range", "").strip())
+        path = self.translate_path(self.path)
+        if not m or os.path.isdir(path):
+            return super().send_head()
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        size = os.fstat(f.fileno()).st_size
+        start_s, end_s = m.groups()
+        if start_s:
+            start = int(start_s)
+            end = min(int(end_s), size - 1) if end_s else size - 1
+        else:
+            start = max(0, size - int(end_s or 0))
+            end = size - 1
+        if start > end or start >= size:
+            f.close()
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.end_headers()
+            return None
+        f.seek(start)
+        self._range_left = end - start + 1
+        self.send_response(HTTPStatus.PARTIAL_CONTENT)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(self._range_left))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        return f
+
+    def copyfile(self, source, outputfile):
+        left = getattr(self, "_range_left", None)
+        if left is None:
+            return super().copyfile(source, outputfile)
+        self._range_left = None
+        while left > 0:
+            buf = source.read(min(64 * 1024, left))
+            if not buf:
+                break
+            outputfile.write(buf)
+            left -= len(buf)
+
+    def end_headers(self):
+        if not self.headers.get("Range"):
+            self.send_header("Accept-Ranges", "bytes")
+        super().end_headers()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--site-dir", default="docs")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    args = p.parse_args()
+    handler = partial(RangeRequestHandler, directory=args.site_dir)
+    with ThreadingHTTPServer((args.host, args.port), handler) as httpd:
+        print(f"Serving {args.site_dir} on http://{args.host}:{args.port}/ (Range requests enabled)")
+        httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
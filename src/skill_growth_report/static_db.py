@@ -0,0 +1,76 @@
+import os
+import sqlite3
+from pathlib import Path
+
+from .dbkit import models  # noqa: F401  注册报告库的表
+from .dbkit.base import Base
+
+# 与前端 sql.js-httpvfs 的 requestChunkSize 保持一致：一次 Range 请求正好取一页
+STATIC_PAGE_SIZE = 1024
+STATIC_DB_NAME = "report.sqlite3"
+
+# 前端按技能编号/名称/标签查询时用到的索引（dbkit.models 已有唯一约束的列不再重复建）
+LOOKUP_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_static_skills_name ON skills (name)",
+    "CREATE INDEX IF NOT EXISTS idx_static_series_skill ON series (skill_id)",
+    "CREATE INDEX IF NOT EXISTS idx_static_series_label ON series (label)",
+]
+
+
+def _copy_table(conn: sqlite3.Connection, name: str) -> None:
+    """
+    复制一张表。以 uuid 作主键的表（id 列由 uuid4 生成，每次构建都不同）按其余列排序后
+    用行号重编 id：内容没变时发布出去的库逐字节相同，代目录的内容摘要才稳定。
+    前端与各表之间的关联都走自然键（skill_id/series_id/family），不用这个 id。
+    """
+    info = conn.execute(f'PRAGMA src.table_info("{name}")').fetchall()
+    cols = [row[1] for row in info]
+    pk = [row[1] for row in info if row[5]]
+    rest = [c for c in cols if c != "id"]
+    if pk != ["id"] or not rest or str(info[cols.index("id")][2]).upper() == "INTEGER":
+        conn.execute(f'INSERT INTO main."{name}" SELECT * FROM src."{name}"')
+        return
+    rest_sql = ", ".join(f'"{c}"' for c in rest)
+    conn.execute(
+        f'INSERT INTO main."{name}" ("id", {rest_sql}) '
+        f'SELECT CAST(ROW_NUMBER() OVER (ORDER BY {rest_sql}) AS TEXT), {rest_sql} '
+        f'FROM src."{name}" ORDER BY {rest_sql}'
+    )
+
+
+def publish_static_db(db_path: Path, out_fp: Path, page_size: int = STATIC_PAGE_SIZE) -> None:
+    """
+    把构建好的库复制成一个面向静态托管的只读 SQLite 文件：
+    小页、VACUUM 后无碎片、带查询索引、journal_mode=DELETE（不需要 -wal 文件）。
+    只复制报告库的表（dbkit.base.Base），旧库里遗留的其他表（如早先误建的空历史表）不会发布出去。
+    uuid 主键按内容重编（见 _copy_table），同样的输入得到同样的文件。
+    先写临时文件再替换，读者不会看到写了一半的库。
+    """
+    tmp = out_fp.with_name(out_fp.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(str(tmp), isolation_level=None)
+    try:
+        conn.execute(f"PRAGMA page_size={int(page_size)}")
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("ATTACH DATABASE ? AS src", (str(db_path),))
+        tables = sorted(Base.metadata.tables)
+        schema = conn.execute(
+            "SELECT type, name, sql FROM src.sqlite_master "
+            f"WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' AND tbl_name IN ({','.join('?' * len(tables))}) ORDER BY type = 'index'",
+            tables,
+        ).fetchall()
+        conn.execute("BEGIN")
+        for typ, name, sql in schema:
+            conn.execute(sql)
+            if typ == "table":
+                _copy_table(conn, name)
+        for sql in LOOKUP_INDEXES:
+            conn.execute(sql)
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE src")
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp, out_fp)
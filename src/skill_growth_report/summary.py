@@ -0,0 +1,68 @@
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from .models import Sequence, Skill
+
+# 与 docs/assets/deps.js 中 window.RESOURCES 保持一致
+RESOURCES = ["精神", "耐力", "气血", "内力"]
+
+# 区间只统计第 10 重及以后（不足 10 重时取全部）
+RANGE_FROM_LEVEL = 10
+
+_NORMALIZE_RE = re.compile(r"[\s\u3000\\\-–—－_]")
+
+
+def normalize_text(s: str) -> str:
+    return _NORMALIZE_RE.sub("", s or "")
+
+
+def pick_range(bucket: Dict[str, List[Sequence]], keys: List[str]) -> Tuple[Optional[float], Optional[float]]:
+    lo: Optional[float] = None
+    hi: Optional[float] = None
+    for k in keys:
+        for seq in bucket.get(k) or []:
+            arr = seq.values
+            vals = arr[RANGE_FROM_LEVEL - 1:] if len(arr) >= RANGE_FROM_LEVEL else arr
+            for v in vals:
+                lo = v if lo is None or v < lo else lo
+                hi = v if hi is None or v > hi else hi
+    return lo, hi
+
+
+def compute_consume_range(groups: Dict[str, Dict[str, List[Sequence]]], meta: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    consume = groups.get("consume") or {}
+    keys = [k for k in RESOURCES if consume.get(k)] or list(consume.keys())
+    if meta.get("threefold_no_spirit_cost"):
+        return 0, 0
+    return pick_range(consume, keys)
+
+
+def compute_deal_range(groups: Dict[str, Dict[str, List[Sequence]]]) -> Tuple[Optional[float], Optional[float]]:
+    deal = groups.get("deal") or {}
+    keys = [k for k in deal if k.endswith("伤害")]
+    if not keys:
+        keys = [k for k in deal if k.endswith("打击")]
+    if not keys:
+        keys = list(deal.keys())
+    return pick_range(deal, keys)
+
+
+def build_summary_row(skill: Skill) -> Dict[str, Any]:
+    consume_min, consume_max = compute_consume_range(skill.groups, skill.meta)
+    deal_min, deal_max = compute_deal_range(skill.groups)
+    return {
+        "sid": skill.skill_id,
+        "name": skill.name,
+        "search_key": normalize_text(skill.name),
+        "description_ids": skill.description_ids,
+        "effect_ids": skill.effect_ids,
+        "consume_min": consume_min,
+        "consume_max": consume_max,
+        "deal_min": deal_min,
+        "deal_max": deal_max,
+        "meta": skill.meta,
+    }
+
+
+def build_summary(skills: List[Skill]) -> List[Dict[str, Any]]:
+    return [build_summary_row(s) for s in skills]
@@ -0,0 +1,45 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class TextDictionary:
+    """
+    全目录共用的文本字典：描述模板的每一行、每条特殊效果各分配一个整数 id，
+    相同文本只存一份。技能记录、source_span 和导出的 skills.json/summary.json 只保存 id，
+    文本本身在库的 texts 表和 data/texts.json 中各存一次。
+
+    id 按首次出现的顺序分配；从库中已有的字典继续编号，重建时旧 id 不变。
+    """
+
+    def __init__(self, texts: Optional[Iterable[str]] = None):
+        self.texts: List[str] = list(texts or [])
+        self.ids: Dict[str, int] = {t: i for i, t in enumerate(self.texts)}
+        self.flushed = len(self.texts)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def intern(self, text: str) -> int:
+        i = self.ids.get(text)
+        if i is None:
+            i = len(self.texts)
+            self.texts.append(text)
+            self.ids[text] = i
+        return i
+
+    def intern_all(self, texts: Iterable[str]) -> List[int]:
+        return [self.intern(t) for t in texts]
+
+    def join(self, ids: Iterable[int], sep: str) -> str:
+        return sep.join(self.texts[i] for i in ids)
+
+    def pending(self) -> List[Tuple[int, str]]:
+        """返回上次调用以来新增、尚未写入库的条目。"""
+        end = len(self.texts)
+        out = [(i, self.texts[i]) for i in range(self.flushed, end)]
+        self.flushed = end
+        return out
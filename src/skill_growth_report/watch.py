@@ -0,0 +1,151 @@
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from .parser import find_skills
+from .build import read_text, process_skill, write_skill, source_span_json, export_results
+from .dbkit.base import get_session
+from .dbkit.crud import delete_skill, delete_series, load_texts
+from .export import ensure_dir
+from .models import Skill
+from .aggregates import refresh_aggregates, families_of
+from .generations import KEEP_GENERATIONS
+from .reader import load_skills
+
+
+def _same_rows(a: Skill, b: Skill) -> bool:
+    """两条记录写进库的内容是否相同（偏移不入库，不参与比较）。"""
+    return a.name == b.name and source_span_json(a) == source_span_json(b) and a.series == b.series
+
+
+class WatchState:
+    """
+    常驻内存的构建状态：保存每个技能块的原文和处理结果，以及打开的 DB 会话。
+    refresh() 重新切分输入后只重新解析原文有变化的技能块，DB 里只改动受影响的行，
+    导出文件内容没变的不重写。
+    启动时内存里还没有处理结果，首次 refresh 把解析结果与库里已有的记录比较，只写真正变了的技能，
+    并删掉输入里已经没有的技能。
+    """
+
+    def __init__(self, input_fp: Path, site_dir: Path, db_path: Path, jump_threshold: float, keep: int = KEEP_GENERATIONS):
+        self.input_fp = input_fp
+        self.site_dir = site_dir
+        self.db_path = db_path
+        self.jump_threshold = jump_threshold
+        self.keep = keep
+        self.session = get_session(db_path)
+        self.texts = load_texts(self.session)
+        self.sources: Dict[str, Tuple[str, str]] = {}
+        self.results: Dict[str, Skill] = {}
+        self.export_cache: Dict[Path, Any] = {}
+        self.stored: Optional[Dict[str, Skill]] = {s.skill_id: s for s in load_skills(db_path)[0]}
+        ensure_dir(site_dir)
+
+    def refresh(self) -> Dict[str, int]:
+        text = read_text(self.input_fp)
+        stats = {"skills": 0, "changed": 0, "moved": 0, "removed": 0}
+        sources: Dict[str, Tuple[str, str]] = {}
+        results: Dict[str, Skill] = {}
+        seen: Dict[str, int] = {}
+        families = set()
+        for name, sid, start, end in find_skills(text):
+            # 同一编号出现多次时按出现次序区分
+            seen[sid] = seen.get(sid, 0) + 1
+            key = f"{sid}#{seen[sid]}"
+            block = text[start:end]
+            prev = self.results.get(key)
+            if prev is not None and self.sources.get(key) == (name, block):
+                r = prev
+                if (r.start, r.end) != (start, end):
+                    # 只是前面的技能变长/变短导致偏移变化；偏移不入库，改内存里的记录即可
+                    r.start, r.end = start, end
+                    stats["moved"] += 1
+            else:
+                r = process_skill(name, sid, start, end, block, self.jump_threshold, self.texts)
+                if prev is None and self.stored is not None:
+                    prev = self.stored.pop(sid, None)
+                if prev is None or not _same_rows(prev, r):
+                    families |= families_of(r.series)
+                    if prev is not None:
+                        families |= families_of(prev.series)
+                        kept = {x.series_id for x in r.series}
+                        delete_series(self.session, [x.series_id for x in prev.series if x.series_id not in kept])
+                    write_skill(self.session, r, self.texts)
+                    stats["changed"] += 1
+            sources[key] = (name, block)
+            results[key] = r
+        live = {r.skill_id for r in results.values()}
+        for key, r in self.results.items():
+            if key not in results:
+                stats["removed"] += 1
+                families |= families_of(r.series)
+                if r.skill_id not in live:
+                    delete_skill(self.session, r.skill_id)
+        first = self.stored is not None
+        for sid, r in (self.stored or {}).items():
+            # 库里有、输入里已经没有的技能
+            if sid not in live:
+                stats["removed"] += 1
+                families |= families_of(r.series)
+                delete_skill(self.session, sid)
+        self.stored = None
+        stats["aggregates"] = refresh_aggregates(self.session, families) if families else 0
+        self.session.commit()
+        self.sources = sources
+        self.results = results
+        stats["skills"] = len(results)
+        # 库在上面的单个事务里更新，读者看不到中间状态；站点数据整体发布成新一代，库没变时沿用上一代的静态库。
+        # 首次 refresh 总是重新生成静态库（站点目录可能还没有），静态库内容确定，库没变时仍落到同一代
+        changed = first or stats["changed"] or stats["removed"]
+        export_results(self.site_dir, list(results.values()), self.texts, self.export_cache, self.db_path if changed else None, self.keep)
+        return stats
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def _signature(fp: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = fp.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def watch(input_fp: Path, site_dir: Path, db_path: Path, jump_threshold: float, interval: float = 0.2, debounce: float = 0.3, keep: int = KEEP_GENERATIONS) -> None:
+    state = WatchState(input_fp, site_dir, db_path, jump_threshold, keep)
+
+    def rebuild() -> None:
+        t0 = time.perf_counter()
+        try:
+            stats = state.refresh()
+        except (OSError, UnicodeDecodeError) as e:
+            state.session.rollback()
+            print(f"rebuild failed: {e}")
+            return
+        print(f"rebuilt in {(time.perf_counter() - t0) * 1000:.0f} ms: {stats}", flush=True)
+
+    # 先取签名再做首次构建，构建期间发生的修改也会被下一轮检测到
+    last = _signature(input_fp)
+    rebuild()
+    print(f"watching {input_fp} (Ctrl+C to stop)", flush=True)
+    try:
+        while True:
+            time.sleep(interval)
+            sig = _signature(input_fp)
+            if sig == last:
+                continue
+            # 去抖：编辑器保存可能分几次写入，等文件在 debounce 时间内不再变化再重建
+            while True:
+                time.sleep(debounce)
+                nxt = _signature(input_fp)
+                if nxt == sig:
+                    break
+                sig = nxt
+            last = sig
+            if sig is not None:
+                rebuild()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.close()
@@ -0,0 +1,112 @@
+import pytest
+
+from translation_kit import CHUNK_SIZE, CachedTranslator, PageCheckpointStore, StubBackend, TranslationMemory, chunk_text, pack_batches
+
+
+class FailOn(StubBackend):
+    """请求里含有 needle 时失败，其余照常加前缀。"""
+
+    def __init__(self, needle: str):
+        super().__init__()
+        self.needle = needle
+
+    def translate(self, text: str) -> str:
+        if self.needle in text:
+            with self._lock:
+                self.calls += 1
+            raise RuntimeError("boom")
+        return super().translate(text)
+
+
+def make_translator(backend, memory=None) -> CachedTranslator:
+    # 不限速、不重试，失败立即退回原文
+    return CachedTranslator(backend, memory, rate=0, retries=0)
+
+
+def test_translate_many_batches_and_dedups():
+    backend = StubBackend()
+    tr = make_translator(backend)
+    texts = ["Hello world.", "Second block.", "Hello  world.", "", "Hello\nworld."]
+    out = tr.translate_many(texts)
+    # 桩后端在合批标记后加前缀，拆回后每段为 "[译] 原文"
+    assert out == ["[译] Hello world.", "[译] Second block.", "[译] Hello world.", "", "[译] Hello world."]
+    # 三个相同的 block 规范化后只翻一次，两段不同的原文合成一次请求
+    assert backend.calls == 1
+    assert tr.stats["requests"] == 1
+
+
+def test_translate_many_reuses_memory(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.db"))
+    backend = StubBackend()
+    tr = make_translator(backend, memory)
+    first = tr.translate_many(["Alpha.", "Beta."])
+    assert tr.translate_many(["Beta.", "Alpha."]) == first[::-1]
+    assert backend.calls == 1
+    tr.close()
+
+
+def test_translate_many_failure_keeps_source(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.db"))
+    tr = make_translator(FailOn("broken"), memory)
+    failed = []
+    out = tr.translate_many(["fine", "broken text"], failed)
+    # 合批请求失败：批内每一段都保留原文、都记为失败，且不写入翻译记忆
+    assert out == ["fine", "broken text"]
+    assert failed == [0, 1]
+    assert tr.stats["failures"] == 1
+    assert len(memory) == 0
+    tr.close()
+
+
+def test_translate_many_failure_does_not_flag_marker_numbers():
+    # 第一批成功，第二批失败；第一批里只有数字的 block 不能因为失败批次的标记编号被算作失败
+    tr = make_translator(FailOn("broken"))
+    texts = ["a " * 1500, "1", "b " * 1500 + "broken", "c"]
+    assert len(pack_batches(texts)) == 2
+    failed = []
+    out = tr.translate_many(texts, failed)
+    assert out[1] == "[译] 1"
+    assert failed == [2, 3]
+
+
+@pytest.mark.parametrize("text", [
+    " ".join(f"Sentence number {i} is here." for i in range(800)),
+    "\n\n".join("Paragraph text. " * 40 for _ in range(20)),
+    "x" * 12000,
+])
+def test_chunk_text_respects_limit(text):
+    chunks = chunk_text(text)
+    assert len(chunks) > 1
+    assert all(0 < len(c) <= CHUNK_SIZE for c in chunks)
+    assert "".join(chunks).replace(" ", "").replace("\n", "") == text.replace(" ", "").replace("\n", "")
+
+
+def test_pack_batches_respects_limit():
+    texts = ["word " * 200] * 30
+    batches = pack_batches(texts)
+    assert [i for b in batches for i in b] == list(range(len(texts)))
+    assert all(sum(len(texts[i]) + len(f"[[{i}]]") + 1 for i in b) <= CHUNK_SIZE for b in batches)
+
+
+def test_checkpoint_skips_completed_pages(tmp_path):
+    job = str(tmp_path / "job")
+    store = PageCheckpointStore(job, "book.pdf", "optimize_translation", "sequential")
+    store.save_page(0, [{"type": "text", "content": "p0"}])
+    store.save_page(1, [{"type": "text", "content": "p1 source"}], complete=False)
+    # 重新打开同一任务：完整的页跳过，部分失败的页还要重翻，但照常参与组装
+    store = PageCheckpointStore(job, "book.pdf", "optimize_translation", "sequential")
+    assert [i for i in range(3) if not store.has_page(i)] == [1, 2]
+    assert store.completed_pages() == [0]
+    assert [it["content"] for it in store.iter_items(range(3))] == ["p0", "p1 source"]
+    store.save_page(1, [{"type": "text", "content": "p1"}])
+    assert store.is_complete(range(2))
+    assert [it["content"] for it in store.iter_items(range(2))] == ["p0", "p1"]
+
+
+def test_checkpoint_rejects_other_job(tmp_path):
+    job = str(tmp_path / "job")
+    PageCheckpointStore(job, "book.pdf", "optimize_translation", "sequential")
+    with pytest.raises(ValueError):
+        PageCheckpointStore(job, "book.pdf", "optimize_translation", "pipelined")
+    with pytest.raises(ValueError):
+        PageCheckpointStore(job, "other.pdf", "optimize_translation", "sequential")
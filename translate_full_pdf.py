@@ -8,6 +8,8 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.colors import black
 import time
 
+from translation_kit import CHUNK_SIZE, LayoutCache, PageCheckpointStore, StreamingStory, chunk_text, words_to_segments
+
 # 注册中文字体
 # 注意：确保 C:\Windows\Fonts\simsun.ttc 存在，否则需要替换为系统存在的字体路径
 try:
@@ -15,19 +17,19 @@ try:
 except:
     print("SimSun font not found. Please check font path.")
 
-def translate_text(text):
+def translate_text(text, failures=None):
     """
     使用 Google Translate 翻译文本。
     为了避免被限制，添加了重试机制和简单的文本分块。
+    翻译失败的分块保留原文；failures 不为空时把这些分块追加进去。
     """
     if not text.strip():
         return ""
     
     translator = GoogleTranslator(source='auto', target='zh-CN')
     
-    # 简单的分块处理，防止超过单次请求限制 (5000 chars)
-    chunk_size = 4500
-    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
+    # 按段落/句子边界分块，防止超过单次请求限制 (5000 chars)，同时不把句子切断
+    chunks = chunk_text(text, CHUNK_SIZE)
     
     translated_chunks = []
     for chunk in chunks:
@@ -35,13 +37,20 @@ def translate_text(text):
             # 简单的清洗
             clean_chunk = chunk.replace('\n', ' ').replace('- ', '')
             res = translator.translate(clean_chunk)
-            translated_chunks.append(res)
+            if res:
+                translated_chunks.append(res)
+            else:
+                translated_chunks.append(chunk) # 翻译返回None时保留原文
+                if failures is not None:
+                    failures.append(chunk)
             time.sleep(0.5) # 稍微暂停，避免请求过快
         except Exception as e:
             print(f"Translation error: {e}")
             translated_chunks.append(chunk) # 翻译失败则保留原文
+            if failures is not None:
+                failures.append(chunk)
     
-    return "".join(translated_chunks)
+    return " ".join(translated_chunks)
 
 def generate_pdf(output_filename, content_list):
     doc = SimpleDocTemplate(output_filename, pagesize=A4)
@@ -67,20 +76,20 @@ def generate_pdf(output_filename, content_list):
         spaceBefore=10
     )
 
-    story = []
-    
-    for item in content_list:
+    def to_flowables(item):
         if item['type'] == 'text':
             # 处理特殊字符
             text = item['content'].replace('<', '&lt;').replace('>', '&gt;')
-            p = Paragraph(text, normal_style)
-            story.append(p)
+            return [Paragraph(text, normal_style)]
         elif item['type'] == 'page_break':
-            story.append(PageBreak())
+            return [PageBreak()]
         elif item['type'] == 'header':
              text = item['content'].replace('<', '&lt;').replace('>', '&gt;')
-             p = Paragraph(text, header_style)
-             story.append(p)
+             return [Paragraph(text, header_style)]
+        return []
+
+    # content_list 可以是列表，也可以是从检查点逐页读取的生成器
+    story = StreamingStory(to_flowables(item) for item in content_list)
 
     try:
         doc.build(story)
@@ -88,10 +97,23 @@ def generate_pdf(output_filename, content_list):
     except Exception as e:
         print(f"PDF generation failed: {e}")
 
-def process_pdf(input_pdf, output_pdf, start_page=0, end_page=None):
+def extract_page_text(page, layout):
+    words = [(w['x0'], w['top'], w['x1'], w['bottom'], w['text']) for w in page.extract_words()]
+    if not words:
+        return ""
+    segments = layout.order(words_to_segments(words), page.width, page.height)
+    return "\n".join(seg[4] for seg in segments)
+
+def process_pdf(input_pdf, output_pdf, start_page=0, end_page=None, job_dir=None):
+    """
+    job_dir 不为空时启用断点续跑：每翻译完一页就写入检查点，
+    重跑时跳过已完成的页，最后从检查点流式生成 PDF。
+    """
     print(f"Processing {input_pdf}...")
     
     content_list = []
+    store = PageCheckpointStore(job_dir, input_pdf, "translate_full_pdf", "page_text") if job_dir else None
+    layout = LayoutCache()
     
     with pdfplumber.open(input_pdf) as pdf:
         total_pages = len(pdf.pages)
@@ -101,43 +123,38 @@ def process_pdf(input_pdf, output_pdf, start_page=0, end_page=None):
         print(f"Total pages to process: {end_page - start_page}")
         
         for i in range(start_page, end_page):
+            if store is not None and store.has_page(i):
+                print(f"Skipping page {i+1}/{total_pages} (checkpointed)")
+                continue
             print(f"Processing page {i+1}/{total_pages}...")
             page = pdf.pages[i]
+            page_items = []
             
             # 提取文本
-            # 简单的文本提取，pdfplumber 默认按阅读顺序
-            text = page.extract_text()
+            # pdfplumber 的 extract_text 会把双栏同一高度的两行拼在一起，
+            # 这里先做版式分析：单词拼成行片段，按检测到的栏排出阅读顺序
+            text = extract_page_text(page, layout)
+            failures = []
             
             if text:
-                # 简单区分一下标题和正文（非常粗略）
-                lines = text.split('\n')
-                translated_lines = []
-                
-                # 批量翻译每一页，而不是每一行，以保持上下文
-                # 但为了显示进度，我们按段落处理
+                translated_page = translate_text(text, failures)
                 
-                # 这里我们简化处理：把整页文本作为一个块翻译
-                # 实际论文中，双栏布局可能需要裁剪，这里先直接提取
-                
-                # 尝试检测左栏和右栏 (简单假设)
-                # width = page.width
-                # left_bbox = (0, 0, width/2, page.height)
-                # right_bbox = (width/2, 0, width, page.height)
-                # left_text = page.within_bbox(left_bbox).extract_text()
-                # right_text = page.within_bbox(right_bbox).extract_text()
-                # full_page_text = (left_text or "") + "\n" + (right_text or "")
-                
-                # 直接提取通常能处理得还行，虽然有时顺序会乱
-                
-                translated_page = translate_text(text)
-                
-                content_list.append({'type': 'header', 'content': f"--- 第 {i+1} 页 ---"})
-                content_list.append({'type': 'text', 'content': translated_page})
-                content_list.append({'type': 'page_break'})
-            
+                page_items.append({'type': 'header', 'content': f"--- 第 {i+1} 页 ---"})
+                page_items.append({'type': 'text', 'content': translated_page})
+                page_items.append({'type': 'page_break'})
+
+            if store is not None:
+                # 有分块保留了原文的页只记为部分完成，重跑时重新翻译
+                store.save_page(i, page_items, complete=not failures)
+            else:
+                content_list.extend(page_items)
+
+    if store is not None:
+        content_list = store.iter_items(range(start_page, end_page))
     generate_pdf(output_pdf, content_list)
 
 if __name__ == "__main__":
     # 为了演示，只翻译前 5 页
     # 如果想翻译全部，设置 end_page=None
-    process_pdf("2303.18223v16.pdf", "2303.18223v16_full_translated_demo.pdf", start_page=0, end_page=None)
+    # 检查点保存在 translate_job_full/（与 optimize_translation.py 的 translate_job/ 分开），中断后重新运行会从上次完成的页继续
+    process_pdf("2303.18223v16.pdf", "2303.18223v16_full_translated_demo.pdf", start_page=0, end_page=None, job_dir="translate_job_full")
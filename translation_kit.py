@@ -0,0 +1,697 @@
+"""
+翻译脚本共用的基础设施（translate_full_pdf.py / optimize_translation.py）。
+
+- 可插拔的翻译后端（Google / 本地桩）
+- 基于 SQLite 的翻译记忆：按规范化后的原文去重，重复的页眉、图注以及重跑都不会重复翻译
+- 限速 + 指数退避重试，替代固定的 time.sleep
+- 按句子/段落边界分块，并把同一页的多个小 block 合并成接近上限的一次请求
+- 按页检查点：长文档翻译可断点续跑，最终 PDF 从检查点流式组装
+- 图片按内容去重，直接以字节传给 PDF 生成
+- 双栏版式检测与阅读顺序排序，版式模板按文档缓存
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 单次请求上限为 5000 字符，留一点余量
+CHUNK_SIZE = 4500
+
+
+def normalize_source(text: str) -> str:
+    """规范化原文：去掉行尾连字符断词，合并空白。作为翻译记忆的键。"""
+    text = re.sub(r"-\s*\n\s*", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# ---------------- 分块与合批 ----------------
+
+_PARA_RE = re.compile(r"\n\s*\n")
+_SENT_RE = re.compile(r"(?<=[.!?;。！？；])\s+")
+# 合批时用编号标记分隔各个 block，翻译后按标记拆回；Google 翻译会原样保留这种标记
+_MARKER = "[[{}]]"
+_MARKER_RE = re.compile(r"\[\s*\[\s*(\d+)\s*\]\s*\]")
+
+
+def _split_long(piece: str, limit: int) -> List[str]:
+    """单句超长时退化为按空白切，再不行才硬切。"""
+    if len(piece) <= limit:
+        return [piece]
+    out: List[str] = []
+    cur = ""
+    for word in piece.split(" "):
+        while len(word) > limit:
+            if cur:
+                out.append(cur)
+                cur = ""
+            out.append(word[:limit])
+            word = word[limit:]
+        cand = f"{cur} {word}" if cur else word
+        if len(cand) > limit:
+            out.append(cur)
+            cur = word
+        else:
+            cur = cand
+    if cur:
+        out.append(cur)
+    return out
+
+
+def chunk_text(text: str, limit: int = CHUNK_SIZE) -> List[str]:
+    """按段落、句子边界把文本装进不超过 limit 的块，尽量不在句子中间切断。"""
+    chunks: List[str] = []
+    cur = ""
+    for para in _PARA_RE.split(text):
+        para = para.strip()
+        if not para:
+            continue
+        pieces = [p for s in _SENT_RE.split(para) for p in _split_long(s, limit)]
+        for i, piece in enumerate(pieces):
+            sep = "\n\n" if i == 0 else " "
+            cand = f"{cur}{sep}{piece}" if cur else piece
+            if len(cand) > limit:
+                chunks.append(cur)
+                cur = piece
+            else:
+                cur = cand
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def pack_batches(texts: List[str], limit: int = CHUNK_SIZE) -> List[List[int]]:
+    """按原顺序把 block 下标贪心装箱，每箱（含分隔标记）不超过 limit；超长 block 单独成箱。"""
+    batches: List[List[int]] = []
+    cur: List[int] = []
+    size = 0
+    for i, t in enumerate(texts):
+        cost = len(t) + len(_MARKER.format(i)) + 1
+        if cur and size + cost > limit:
+            batches.append(cur)
+            cur, size = [], 0
+        cur.append(i)
+        size += cost
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def join_batch(texts: List[str]) -> str:
+    return "\n".join(f"{_MARKER.format(i)} {t}" for i, t in enumerate(texts))
+
+
+def split_batch(translated: str, n: int) -> Optional[List[str]]:
+    """按标记拆回 n 段译文；标记丢失或顺序不对时返回 None，由调用方逐条重译。"""
+    marks = list(_MARKER_RE.finditer(translated))
+    if [int(m.group(1)) for m in marks] != list(range(n)):
+        return None
+    out: List[str] = []
+    for k, m in enumerate(marks):
+        end = marks[k + 1].start() if k + 1 < len(marks) else len(translated)
+        out.append(translated[m.end():end].strip())
+    return out
+
+
+def translate_batched(texts: List[str], translate_fn: Callable[[str], str], limit: int = CHUNK_SIZE) -> List[str]:
+    """
+    把多个小 block 合并成接近 limit 的请求翻译，再拆回各自的位置。
+    请求数从“每个 block 一次”降到“每 limit 字符一次”；拆分失败的批次退回逐条翻译。
+    """
+    results: List[str] = [""] * len(texts)
+    for batch in pack_batches(texts, limit):
+        if len(batch) == 1:
+            results[batch[0]] = translate_fn(texts[batch[0]])
+            continue
+        parts = split_batch(translate_fn(join_batch([texts[i] for i in batch])), len(batch))
+        if parts is None:
+            parts = [translate_fn(texts[i]) for i in batch]
+        for i, part in zip(batch, parts):
+            results[i] = part
+    return results
+
+
+# ---------------- 翻译后端 ----------------
+
+class TranslatorBackend:
+    """翻译后端接口：translate(text) 返回译文，失败时抛异常。"""
+    name = "base"
+
+    def translate(self, text: str) -> str:
+        raise NotImplementedError
+
+
+class GoogleBackend(TranslatorBackend):
+    name = "google"
+
+    def __init__(self, source: str = "auto", target: str = "zh-CN"):
+        self.source = source
+        self.target = target
+        # GoogleTranslator 实例内部有可变状态，按线程复用而不是每次调用都新建
+        self._local = threading.local()
+
+    def _translator(self):
+        tr = getattr(self._local, "translator", None)
+        if tr is None:
+            from deep_translator import GoogleTranslator
+            tr = GoogleTranslator(source=self.source, target=self.target)
+            self._local.translator = tr
+        return tr
+
+    def translate(self, text: str) -> str:
+        res = self._translator().translate(text)
+        if res is None:
+            raise RuntimeError("empty translation")
+        return res
+
+
+class StubBackend(TranslatorBackend):
+    """本地桩实现，不联网，用于在没有网络时测试整条流水线。"""
+    name = "stub"
+
+    def __init__(self, prefix: str = "[译]", delay: float = 0.0, fail_every: int = 0):
+        self.prefix = prefix
+        self.delay = delay
+        self.fail_every = fail_every
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def translate(self, text: str) -> str:
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_every and n % self.fail_every == 0:
+            raise RuntimeError(f"stub failure on call {n}")
+        # 像真实翻译一样原样保留合批分隔标记，只在每段正文前加前缀
+        return _MARKER_RE.sub(lambda m: f"{m.group(0)} {self.prefix}", text) if _MARKER_RE.match(text) else f"{self.prefix}{text}"
+
+
+BACKENDS: Dict[str, Callable[..., TranslatorBackend]] = {
+    "google": GoogleBackend,
+    "stub": StubBackend,
+}
+
+
+def get_backend(name: str, **kwargs) -> TranslatorBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"unknown translator backend: {name}")
+    return BACKENDS[name](**kwargs)
+
+
+# ---------------- 翻译记忆 ----------------
+
+class TranslationMemory:
+    """SQLite 翻译记忆，键为 (目标语言, 规范化原文) 的哈希。线程安全。"""
+
+    def __init__(self, db_path: str = "translation_memory.db", target: str = "zh-CN"):
+        self.target = target
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tm ("
+            "key TEXT PRIMARY KEY, target TEXT NOT NULL, source TEXT NOT NULL, "
+            "translation TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _key(self, norm: str) -> str:
+        return hashlib.sha1(f"{self.target}\0{norm}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[str]:
+        norm = normalize_source(text)
+        with self._lock:
+            row = self._conn.execute("SELECT translation FROM tm WHERE key = ?", (self._key(norm),)).fetchone()
+        return row[0] if row else None
+
+    def put(self, text: str, translation: str) -> None:
+        norm = normalize_source(text)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tm (key, target, source, translation, created) VALUES (?, ?, ?, ?, ?)",
+                (self._key(norm), self.target, norm, translation, time.time()),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ---------------- 限速与重试 ----------------
+
+class RateLimiter:
+    """全局限速：保证相邻两次请求间隔不小于 1/rate 秒。rate<=0 表示不限速。"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def call_with_retry(fn: Callable[[str], str], text: str, limiter: Optional[RateLimiter] = None, retries: int = 4, backoff: float = 1.0, max_backoff: float = 30.0) -> str:
+    """调用 fn(text)，失败时按指数退避（带抖动）重试，重试耗尽后抛出最后一次异常。"""
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.wait()
+        try:
+            return fn(text)
+        except Exception:
+            if attempt == retries:
+                raise
+            delay = min(max_backoff, backoff * (2 ** attempt))
+            time.sleep(delay * (0.5 + random.random() / 2))
+    raise RuntimeError("unreachable")
+
+
+class CachedTranslator:
+    """
+    翻译记忆 + 限速 + 重试 的组合，可在线程池中并发调用。
+    同一段原文并发请求时只会真正翻译一次，其余调用等待同一结果。
+    """
+
+    def __init__(self, backend: TranslatorBackend, memory: Optional[TranslationMemory] = None, rate: float = 2.0, retries: int = 4, backoff: float = 1.0):
+        self.backend = backend
+        self.memory = memory
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = {"hits": 0, "requests": 0, "failures": 0}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _request(self, text: str) -> str:
+        with self._lock:
+            self.stats["requests"] += 1
+        return call_with_retry(self.backend.translate, text, self.limiter, self.retries, self.backoff)
+
+    def _translate_uncached(self, norm: str) -> str:
+        return " ".join(self._request(c) for c in chunk_text(norm))
+
+    def translate(self, text: str) -> str:
+        norm = normalize_source(text)
+        if not norm:
+            return ""
+        if self.memory is not None:
+            hit = self.memory.get(norm)
+            if hit is not None:
+                with self._lock:
+                    self.stats["hits"] += 1
+                return hit
+        with self._lock:
+            fut = self._inflight.get(norm)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[norm] = fut
+        if not owner:
+            with self._lock:
+                self.stats["hits"] += 1
+            return fut.result()
+        try:
+            res = self._translate_uncached(norm)
+            if self.memory is not None:
+                self.memory.put(norm, res)
+        except Exception as e:
+            # 重试耗尽：保留原文，且不写入翻译记忆，下次重跑还会再试
+            print(f"Translation error: {e}")
+            with self._lock:
+                self.stats["failures"] += 1
+            res = norm
+        fut.set_result(res)
+        with self._lock:
+            self._inflight.pop(norm, None)
+        return res
+
+    def translate_many(self, texts: List[str], failed_indexes: Optional[List[int]] = None) -> List[str]:
+        """
+        批量翻译一页（或几页）的 block：先查翻译记忆，未命中且不重复的原文
+        合批后发出请求，结果写回翻译记忆。返回与 texts 一一对应的译文。
+        failed_indexes 不为空时，翻译失败、保留了原文的下标会追加进去，调用方据此不把该页记为完成。
+        """
+        norms = [normalize_source(t) for t in texts]
+        found: Dict[str, str] = {"": ""}
+        misses: List[str] = []
+        for norm in norms:
+            if norm in found or norm in misses:
+                continue
+            hit = self.memory.get(norm) if self.memory is not None else None
+            if hit is None:
+                misses.append(norm)
+            else:
+                found[norm] = hit
+        with self._lock:
+            self.stats["hits"] += len(norms) - len(misses)
+
+        def request_or_keep(text: str) -> str:
+            # 单次请求失败时保留原文（不写入翻译记忆），与 translate 的行为一致
+            try:
+                if len(text) > CHUNK_SIZE:
+                    return self._translate_uncached(text)
+                return self._request(text)
+            except Exception as e:
+                print(f"Translation error: {e}")
+                with self._lock:
+                    self.stats["failures"] += 1
+                # 合批请求失败时，批内每一段都算失败；split 的结果里奇数位是捕获到的标记编号，不是原文
+                failed.update(seg.strip() for seg in _MARKER_RE.split(text)[::2])
+                return text
+
+        failed: set = set()
+        translated = translate_batched(misses, request_or_keep)
+        for norm, res in zip(misses, translated):
+            found[norm] = res
+            if self.memory is not None and norm not in failed:
+                self.memory.put(norm, res)
+        if failed_indexes is not None:
+            failed_indexes.extend(i for i, norm in enumerate(norms) if norm in failed)
+        return [found[norm] for norm in norms]
+
+    def close(self) -> None:
+        if self.memory is not None:
+            self.memory.close()
+
+
+# ---------------- 断点续跑 ----------------
+
+class PageCheckpointStore:
+    """
+    按页保存翻译结果的检查点目录：
+        <job_dir>/job.json           任务信息（输入文件、生成检查点的脚本与模式），用于防止串用检查点
+        <job_dir>/pages/00012.json   第 13 页的 content 条目（text/header/image/page_break）
+        <job_dir>/pages/00013.partial.json
+                                     第 14 页有 block 翻译失败、保留了原文：照常参与最终组装，
+                                     但不算完成，重跑时重新翻译
+        <job_dir>/images/            该任务提取出的图片（ImageStore，按指纹命名）
+    每页写入先落临时文件再 os.replace，崩溃时不会留下半页。
+    """
+
+    def __init__(self, job_dir: str, input_pdf: str, script: str = "", mode: str = ""):
+        self.job_dir = job_dir
+        self.pages_dir = os.path.join(job_dir, "pages")
+        self.images_dir = os.path.join(job_dir, "images")
+        os.makedirs(self.pages_dir, exist_ok=True)
+        os.makedirs(self.images_dir, exist_ok=True)
+        manifest = os.path.join(job_dir, "job.json")
+        # 不同脚本/模式的页条目格式不同（整页文本 vs 按 block、带图片），不能互相续跑
+        info = {"input": os.path.abspath(input_pdf), "script": script, "mode": mode}
+        if os.path.exists(manifest):
+            with open(manifest, "r", encoding="utf-8") as f:
+                old = json.load(f)
+            if old.get("input") != info["input"]:
+                raise ValueError(f"checkpoint dir {job_dir} belongs to {old.get('input')}")
+            if (old.get("script"), old.get("mode")) != (script, mode):
+                raise ValueError(f"checkpoint dir {job_dir} was written by {old.get('script')} ({old.get('mode')}), not {script} ({mode})")
+        else:
+            _atomic_write_json(manifest, info)
+
+    def _page_path(self, page_index: int, complete: bool = True) -> str:
+        return os.path.join(self.pages_dir, f"{page_index:05d}{'' if complete else '.partial'}.json")
+
+    def has_page(self, page_index: int) -> bool:
+        """只有完整翻译的页才算完成；部分失败的页重跑时还要再翻。"""
+        return os.path.exists(self._page_path(page_index))
+
+    def save_page(self, page_index: int, items: List[Dict[str, Any]], complete: bool = True) -> None:
+        _atomic_write_json(self._page_path(page_index, complete), items)
+        if complete and os.path.exists(self._page_path(page_index, False)):
+            os.remove(self._page_path(page_index, False))
+
+    def load_page(self, page_index: int) -> List[Dict[str, Any]]:
+        path = self._page_path(page_index)
+        if not os.path.exists(path):
+            path = self._page_path(page_index, False)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def completed_pages(self) -> List[int]:
+        return sorted(int(n[:-5]) for n in os.listdir(self.pages_dir) if n.endswith(".json") and not n.endswith(".partial.json"))
+
+    def is_complete(self, page_indexes: Iterable[int]) -> bool:
+        return all(self.has_page(i) for i in page_indexes)
+
+    def remove_images(self) -> None:
+        """
+        最终 PDF 写出后删除图片目录。引用图片的页检查点一并删除，
+        重跑同一任务时这些页会重新提取（译文可命中翻译记忆），而不是生成缺图的 PDF。
+        """
+        for n in os.listdir(self.pages_dir):
+            path = os.path.join(self.pages_dir, n)
+            with open(path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+            if any(it.get("type") == "image" for it in items):
+                os.remove(path)
+        shutil.rmtree(self.images_dir, ignore_errors=True)
+
+    def iter_items(self, page_indexes: Iterable[int]) -> Iterator[Dict[str, Any]]:
+        """按页序逐页读取检查点（含部分失败的页），同一时刻只有一页在内存里。"""
+        for i in page_indexes:
+            if self.has_page(i) or os.path.exists(self._page_path(i, False)):
+                yield from self.load_page(i)
+
+
+def _atomic_write_json(path: str, data: Any) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class StreamingStory(list):
+    """
+    给 reportlab 的 doc.build 用的“懒加载”故事列表。
+    doc.build 每处理一个 flowable 都会调用 len()，这里在列表快耗尽时
+    才从生成器补充下一批 flowable，因此整本书不需要同时驻留内存。
+    """
+
+    def __init__(self, source: Iterable[List[Any]], low_water: int = 64):
+        super().__init__()
+        self._source: Optional[Iterator[List[Any]]] = iter(source)
+        self._low_water = low_water
+
+    def _fill(self) -> None:
+        while self._source is not None and list.__len__(self) < self._low_water:
+            try:
+                self.extend(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self) -> int:
+        self._fill()
+        return list.__len__(self)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+# ---------------- 图片 ----------------
+
+class ImageStore:
+    """
+    按内容指纹去重的图片仓库，content 条目里只记录指纹。
+    spill_dir 为空时图片只保存在内存中，进程结束即释放，不留临时文件；
+    否则写成 <spill_dir>/<指纹>.png（断点续跑时使用），读取时按需从磁盘加载。
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None):
+        self.spill_dir = spill_dir
+        self.stats = {"unique": 0, "duplicates": 0}
+        self._data: Dict[str, bytes] = {}
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.spill_dir, f"{digest}.png")
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._data or (self.spill_dir is not None and os.path.exists(self._path(digest)))
+
+    def add(self, fingerprint: bytes, encode: Callable[[], bytes]) -> str:
+        """fingerprint 相同的图片只编码、保存一次；encode() 仅在第一次出现时调用。"""
+        digest = hashlib.sha1(fingerprint).hexdigest()
+        if digest in self:
+            self.stats["duplicates"] += 1
+            return digest
+        data = encode()
+        if self.spill_dir is not None:
+            tmp = f"{self._path(digest)}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(digest))
+        else:
+            self._data[digest] = data
+        self.stats["unique"] += 1
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        if digest in self._data:
+            return self._data[digest]
+        with open(self._path(digest), "rb") as f:
+            return f.read()
+
+
+# ---------------- 版式分析（双栏） ----------------
+
+# block 约定为 (x0, y0, x1, y1, ...) 的序列，PyMuPDF 的 blocks 和下面由 pdfplumber 行构造的元组都满足
+Column = Tuple[float, float]
+
+# 栏宽量级的 block：宽度在页宽的 COLUMN_MIN_WIDTH ~ COLUMN_MAX_SPAN 之间。聚类和模板试套共用这组阈值
+COLUMN_MIN_WIDTH = 0.1
+COLUMN_MAX_SPAN = 0.6
+
+
+def detect_columns(blocks: Sequence[Sequence[Any]], page_width: float, min_width: float = COLUMN_MIN_WIDTH, max_span: float = COLUMN_MAX_SPAN, x_tol: float = 0.03) -> List[Column]:
+    """
+    对栏宽量级的 block（宽度在页面的 min_width ~ max_span 之间）按左边界 x0 聚类：
+    x0 相差不超过页宽 x_tol 的归为一簇，block 数足够多的簇就是一栏的起点。
+    居中的标题、页码各自的 x0 都是孤立值，不会被当成栏。
+    返回按 x 排序的栏区间，单栏时只有一个元素，没有 block 时返回空列表。
+    """
+    if not blocks:
+        return []
+    full = (min(b[0] for b in blocks), max(b[2] for b in blocks))
+    narrow = sorted((b[0], b[2]) for b in blocks if page_width * min_width <= b[2] - b[0] <= page_width * max_span)
+    if not narrow:
+        return [full]
+    tol = page_width * x_tol
+    clusters: List[List[Tuple[float, float]]] = [[narrow[0]]]
+    for x0, x1 in narrow[1:]:
+        if x0 - clusters[-1][-1][0] <= tol:
+            clusters[-1].append((x0, x1))
+        else:
+            clusters.append([(x0, x1)])
+    min_count = max(2, len(narrow) // 5)
+    starts = [c for c in clusters if len(c) >= min_count]
+    if len(starts) < 2:
+        return [full]
+    cols: List[Column] = []
+    for i, c in enumerate(starts):
+        right = max(x1 for _, x1 in c)
+        if i + 1 < len(starts):
+            right = min(right, starts[i + 1][0][0])
+        cols.append((c[0][0], right))
+    return cols
+
+
+def _column_of(block: Sequence[Any], columns: List[Column]) -> Optional[int]:
+    """block 完全落在某一栏内时返回栏下标，横跨多栏（标题、通栏图）时返回 None。"""
+    for i, (c0, c1) in enumerate(columns):
+        if block[0] >= c0 - 1 and block[2] <= c1 + 1:
+            return i
+    return None
+
+
+def order_blocks(blocks: Sequence[Sequence[Any]], columns: List[Column]) -> List[Sequence[Any]]:
+    """
+    按阅读顺序排序：自上而下，遇到通栏 block 就把它之前的内容按“先左栏后右栏”输出，
+    所以通栏标题/图片会把页面切成若干段，每段内部按栏阅读。
+    """
+    by_y = sorted(blocks, key=lambda b: (b[1], b[0]))
+    if len(columns) < 2:
+        return by_y
+    out: List[Sequence[Any]] = []
+    section: List[Tuple[int, Sequence[Any]]] = []
+    for b in by_y:
+        col = _column_of(b, columns)
+        if col is None:
+            out.extend(x for _, x in sorted(section, key=lambda cb: (cb[0], cb[1][1])))
+            section = []
+            out.append(b)
+        else:
+            section.append((col, b))
+    out.extend(x for _, x in sorted(section, key=lambda cb: (cb[0], cb[1][1])))
+    return out
+
+
+class LayoutCache:
+    """
+    单个文档的版式模板缓存。论文的版式基本每页相同：先用已有模板试套，
+    页面上栏宽量级的 block 至少 min_fit（默认 80%）落入模板的某一栏就直接复用，
+    只有套不上时才重新聚类。min_width/max_span 与 detect_columns 含义相同，两处共用。
+    """
+
+    def __init__(self, tolerance: float = 2.0, min_width: float = COLUMN_MIN_WIDTH, max_span: float = COLUMN_MAX_SPAN, min_fit: float = 0.8):
+        self.tolerance = tolerance
+        self.min_width = min_width
+        self.max_span = max_span
+        self.min_fit = min_fit
+        self.templates: Dict[Tuple[int, int], List[List[Column]]] = {}
+        self.stats = {"reused": 0, "clustered": 0}
+
+    def _fits(self, blocks: Sequence[Sequence[Any]], columns: List[Column], page_width: float) -> bool:
+        # 栏宽量级的 block 至少 min_fit 落在模板的某一栏内（允许少量居中标题、通栏图注）
+        tol = self.tolerance
+        total = inside = 0
+        for b in blocks:
+            if not page_width * self.min_width <= b[2] - b[0] <= page_width * self.max_span:
+                continue
+            total += 1
+            if any(b[0] >= c0 - tol and b[2] <= c1 + tol for c0, c1 in columns):
+                inside += 1
+        return total > 0 and inside >= total * self.min_fit
+
+    def columns_for(self, blocks: Sequence[Sequence[Any]], page_width: float, page_height: float) -> List[Column]:
+        key = (round(page_width), round(page_height))
+        for columns in self.templates.get(key, []):
+            if self._fits(blocks, columns, page_width):
+                self.stats["reused"] += 1
+                return columns
+        columns = detect_columns(blocks, page_width, self.min_width, self.max_span)
+        self.stats["clustered"] += 1
+        # 单栏页（封面、参考文献尾页等）不进模板，否则会吞掉后续双栏页
+        if len(columns) > 1:
+            self.templates.setdefault(key, []).append(columns)
+        return columns
+
+    def order(self, blocks: Sequence[Sequence[Any]], page_width: float, page_height: float) -> List[Sequence[Any]]:
+        return order_blocks(blocks, self.columns_for(blocks, page_width, page_height))
+
+
+def words_to_segments(words: Sequence[Sequence[Any]], gap: float = 12.0, y_tol: float = 3.0) -> List[Tuple[float, float, float, float, str]]:
+    """
+    把单词框 (x0, top, x1, bottom, text) 拼成“行片段”：先按纵坐标分行，
+    同一行内相邻单词间距超过 gap（栏间空白）就断开。双栏页上每个片段就是某一栏里的一行，
+    可以直接交给 LayoutCache.order 排序。
+    """
+    rows: List[List[Sequence[Any]]] = []
+    for w in sorted(words, key=lambda w: (w[1], w[0])):
+        if rows and abs(w[1] - rows[-1][0][1]) <= y_tol:
+            rows[-1].append(w)
+        else:
+            rows.append([w])
+    segments: List[Tuple[float, float, float, float, str]] = []
+    for row in rows:
+        row.sort(key=lambda w: w[0])
+        cur = [row[0]]
+        for w in row[1:]:
+            if w[0] - cur[-1][2] > gap:
+                segments.append(_merge_words(cur))
+                cur = []
+            cur.append(w)
+        segments.append(_merge_words(cur))
+    return segments
+
+
+def _merge_words(ws: Sequence[Sequence[Any]]) -> Tuple[float, float, float, float, str]:
+    return (ws[0][0], min(w[1] for w in ws), ws[-1][2], max(w[3] for w in ws), " ".join(w[4] for w in ws))